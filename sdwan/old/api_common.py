@@ -0,0 +1,46 @@
+import json
+from typing import Dict, List, Sequence
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ---------- Constants ----------
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+# ---------- HTTP ----------
+def make_session(pool_connections: int = 10, pool_maxsize: int = 10, backoff_factor: float = 0.3,
+                 retry_posts: bool = False) -> requests.Session:
+    """Returns a keep-alive session that retries transient errors.
+
+    retry_posts also retries POST; only for scripts whose POSTs are read-only queries.
+    """
+    retry_kwargs = {"allowed_methods": ["GET", "POST"]} if retry_posts else {}
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+        max_retries=Retry(total=3, backoff_factor=backoff_factor, status_forcelist=RETRY_STATUSES, **retry_kwargs),
+    ))
+    return session
+
+# ---------- JSON ----------
+# orjson is optional; fall back to the stdlib codec when it is not installed
+def json_loads(content):
+    return orjson.loads(content) if orjson is not None else json.loads(content)
+
+def json_dumps(payload):
+    return orjson.dumps(payload) if orjson is not None else json.dumps(payload)
+
+# ---------- Lookups ----------
+def build_name_index(items: List[Dict], fields: Sequence[str] = ('name', 'display_name')) -> Dict[str, Dict]:
+    """Maps the lowercased value of each of fields to the first matching object."""
+    index = {}
+    for item in items:
+        for value in map(item.get, fields):
+            if value:
+                index.setdefault(value.strip().lower(), item)
+    return index
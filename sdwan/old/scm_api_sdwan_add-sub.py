@@ -5,15 +5,90 @@
 # Not an official PANW product. No support/warranty. See DISCLAIMER.md.
 
 import os
+import copy
 import json
 import argparse
-import requests
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Optional
+from api_common import make_session, json_loads, json_dumps, build_name_index
 
 # ---------- Constants ----------
 AUTH_URL = "https://auth.apps.paloaltonetworks.com/oauth2/access_token"
 BASE_API_URL = "https://api.sase.paloaltonetworks.com"
 
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) seconds
+
+# Shared keep-alive session with retries on transient errors
+SESSION = make_session(pool_connections=10, pool_maxsize=10, backoff_factor=1)
+
+# Example sub-interface payload; only the fields patched in main() vary per request
+_SUBINTERFACE_TEMPLATE: Dict[str, Any] = {
+  "parent": "1741294034078022545",
+  "type": "subinterface",
+  "used_for": "lan",
+  "power_usage_threshold": 0,
+  "mtu": 0,
+  "name": "",
+  "description": "transfer vlan 110",
+  "attached_lan_networks": None,
+  "site_wan_interface_ids": None,
+  "mac_address": None,
+  "ipv4_config": {
+    "dhcp_config": None,
+    "type": "static",
+    "routes": None,
+    "dns_v4_config": {
+      "name_servers": []
+    },
+    "static_config": {
+      "address": "192.168.110.1/24"
+    }
+  },
+  "ipv6_config": None,
+  "dhcp_relay": None,
+  "ethernet_port": {
+    "full_duplex": False,
+    "speed": 0
+  },
+  "admin_up": "true",
+  "nat_address": None,
+  "nat_port": None,
+  "nat_address_v6": None,
+  "nat_port_v6": 0,
+  "bound_interfaces": None,
+  "sub_interface": {
+    "vlan_id": "110",
+    "native_vlan": False
+  },
+  "pppoe_config": None,
+  "network_context_id": None,
+  "bypass_pair": None,
+  "peer_bypasspair_wan_port_type": "none",
+  "port_channel_config": None,
+  "service_link_config": None,
+  "sgi_apply_static_tag": None,
+  "scope": "global",
+  "tags": None,
+  "nat_zone_id": None,
+  "devicemgmt_policysetstack_id": None,
+  "nat_pools": None,
+  "directed_broadcast": False,
+  "ipfixcollectorcontext_id": None,
+  "ipfixfiltercontext_id": None,
+  "secondary_ip_configs": None,
+  "static_arp_configs": None,
+  "cellular_config": None,
+  "multicast_config": None,
+  "poe_enabled": False,
+  "lldp_enabled": None,
+  "switch_port_config": None,
+  "authentication_config": None,
+  "vlan_config": None,
+  "interface_profile_id": None,
+  "vrf_context_id": "1737015242377022245",
+  "fec_mode": None,
+  "loopback_config": None
+}
+
 def _must_env(name: str) -> str:
     v = os.getenv(name)
     if not v:
@@ -27,9 +102,9 @@ def get_token() -> str:
         "scope": f"tsg_id:{_must_env('PRISMASASE_TSG_ID')}",
         "grant_type": "client_credentials",
     }
-    r = requests.post(AUTH_URL, data=data, timeout=30)
+    r = SESSION.post(AUTH_URL, data=data, timeout=30)
     r.raise_for_status()
-    return r.json()["access_token"]
+    return json_loads(r.content)["access_token"]
 
 def get_headers(token: str) -> Dict[str, str]:
     return {
@@ -42,24 +117,24 @@ def get_headers(token: str) -> Dict[str, str]:
 def get_profile(token: str, headers: Dict[str, str]) -> Dict[str, Any]:
     # Mandatory first API call for Prisma SD-WAN
     url = f"{BASE_API_URL}/sdwan/v2.1/api/profile"
-    r = requests.get(url, headers=headers, timeout=30)
+    r = SESSION.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
     r.raise_for_status()
     print("profile api status: 200")
-    return r.json()
+    return json_loads(r.content)
 
-def find_id_by_name(items: List[Dict[str, Any]], target_name: str) -> Optional[str]:
-    for item in items:
-        # Check both 'name' and 'display_name' common in SD-WAN API
-        if item.get("name") == target_name or item.get("display_name") == target_name:
-            return str(item.get("id"))
-    return None
+def find_id_by_name(index: Dict[str, Dict[str, Any]], target_name: str) -> Optional[str]:
+    item = index.get(target_name.strip().lower())
+    return str(item.get("id")) if item is not None else None
 
 def main():
     parser = argparse.ArgumentParser(description="Add Prisma SD-WAN Sub-interface")
     parser.add_argument("-S", "--site", required=True, help="Site Name")
     parser.add_argument("-D", "--device", required=True, help="Device (Element) Name")
     parser.add_argument("-I", "--interface", required=True, help="Parent Interface Name")
-    parser.add_argument("-P", "--parameters", required=True, help="Path to parameters.txt")
+    parser.add_argument("-P", "--parameters", help="Path to parameters.txt (JSON fields merged over the template)")
+    parser.add_argument("--vlan", help="Sub-interface VLAN ID")
+    parser.add_argument("--address", help="Static IPv4 address/prefix")
+    parser.add_argument("--description", help="Interface description")
     args = parser.parse_args()
 
     # 1. Auth & Profile (Mandatory)
@@ -68,108 +143,49 @@ def main():
     get_profile(token, headers)
 
     # 2. Resolve Site ID
-    sites_res = requests.get(f"{BASE_API_URL}/sdwan/v4.11/api/sites", headers=headers)
-    site_id = find_id_by_name(sites_res.json().get("items", []), args.site)
+    sites_res = SESSION.get(f"{BASE_API_URL}/sdwan/v4.11/api/sites", headers=headers, timeout=REQUEST_TIMEOUT)
+    site_id = find_id_by_name(build_name_index(json_loads(sites_res.content).get("items", [])), args.site)
     if not site_id:
         print(f"Error: Site '{args.site}' not found.")
         return
 
     # 3. Resolve Element ID
-    elems_res = requests.get(f"{BASE_API_URL}/sdwan/v3.1/api/elements", headers=headers)
-    # Filter elements belonging to this site
-    site_elements = [e for e in elems_res.json().get("items", []) if str(e.get("site_id")) == site_id]
-    element_id = find_id_by_name(site_elements, args.device)
+    # Only elements belonging to this site (filtered by the API)
+    elems_res = SESSION.get(f"{BASE_API_URL}/sdwan/v3.1/api/elements?site_id={site_id}", headers=headers, timeout=REQUEST_TIMEOUT)
+    site_elements = json_loads(elems_res.content).get("items", [])
+    element_id = find_id_by_name(build_name_index(site_elements), args.device)
     if not element_id:
         print(f"Error: Device '{args.device}' not found in site.")
         return
 
     # 4. Resolve Parent Interface ID
     intf_url = f"{BASE_API_URL}/sdwan/v4.21/api/sites/{site_id}/elements/{element_id}/interfaces"
-    intfs_res = requests.get(intf_url, headers=headers)
-    parent_id = find_id_by_name(intfs_res.json().get("items", []), args.interface)
+    intfs_res = SESSION.get(intf_url, headers=headers, timeout=REQUEST_TIMEOUT)
+    parent_id = find_id_by_name(build_name_index(json_loads(intfs_res.content).get("items", [])), args.interface)
     if not parent_id:
         print(f"Error: Parent interface '{args.interface}' not found.")
         return
 
-    # 5. Load Payload and Post
-    with open(args.parameters, 'r') as f:
-        payload = json.load(f)
-    #example payload json file
-    payload = {
-  "parent": "1741294034078022545",
-  "type": "subinterface",
-  "used_for": "lan",
-  "power_usage_threshold": 0,
-  "mtu": 0,
-  "name": "",
-  "description": "transfer vlan 110",
-  "attached_lan_networks": null,
-  "site_wan_interface_ids": null,
-  "mac_address": null,
-  "ipv4_config": {
-    "dhcp_config": null,
-    "type": "static",
-    "routes": null,
-    "dns_v4_config": {
-      "name_servers": []
-    },
-    "static_config": {
-      "address": "192.168.110.1/24"
-    }
-  },
-  "ipv6_config": null,
-  "dhcp_relay": null,
-  "ethernet_port": {
-    "full_duplex": false,
-    "speed": 0
-  },
-  "admin_up": "true",
-  "nat_address": null,
-  "nat_port": null,
-  "nat_address_v6": null,
-  "nat_port_v6": 0,
-  "bound_interfaces": null,
-  "sub_interface": {
-    "vlan_id": "110",
-    "native_vlan": false
-  },
-  "pppoe_config": null,
-  "network_context_id": null,
-  "bypass_pair": null,
-  "peer_bypasspair_wan_port_type": "none",
-  "port_channel_config": null,
-  "service_link_config": null,
-  "sgi_apply_static_tag": null,
-  "scope": "global",
-  "tags": null,
-  "nat_zone_id": null,
-  "devicemgmt_policysetstack_id": null,
-  "nat_pools": null,
-  "directed_broadcast": false,
-  "ipfixcollectorcontext_id": null,
-  "ipfixfiltercontext_id": null,
-  "secondary_ip_configs": null,
-  "static_arp_configs": null,
-  "cellular_config": null,
-  "multicast_config": null,
-  "poe_enabled": false,
-  "lldp_enabled": null,
-  "switch_port_config": null,
-  "authentication_config": null,
-  "vlan_config": null,
-  "interface_profile_id": null,
-  "vrf_context_id": "1737015242377022245",
-  "fec_mode": null,
-  "loopback_config": null
-}
+    # 5. Build Payload and Post
+    # Template defaults, then any fields from the parameters file, then CLI overrides
+    payload = copy.deepcopy(_SUBINTERFACE_TEMPLATE)
+    if args.parameters:
+        with open(args.parameters, 'r') as f:
+            payload.update(json.load(f))
+    if args.vlan:
+        payload["sub_interface"]["vlan_id"] = args.vlan
+    if args.address:
+        payload["ipv4_config"]["static_config"]["address"] = args.address
+    if args.description:
+        payload["description"] = args.description
     payload["parent"] = parent_id
     
     print(f"Adding sub-interface to {args.device}...")
-    resp = requests.post(intf_url, headers=headers, json=payload)
+    resp = SESSION.post(intf_url, headers=headers, data=json_dumps(payload), timeout=REQUEST_TIMEOUT)
     
     if resp.status_code in [200, 201]:
         print("Success!")
-        print(json.dumps(resp.json(), indent=2))
+        print(json.dumps(json_loads(resp.content), indent=2))
     else:
         print(f"Failed: {resp.status_code} - {resp.text}")
 
@@ -3,24 +3,21 @@
 # Copyright (c) 2025 Vladimir Franca
 # Disclaimer: Personal project by a Palo Alto Networks employee.
 # Not an official PANW product. No support/warranty. See DISCLAIMER.md.
+# Set PRISMASASE_REGION to your tenant region (e.g. us, de); defaults to de.
 
-# ---------- time parsing ----------
-from datetime import datetime, timedelta, timezone
-import argparse
-import csv
-import sys
-import requests
 import os
 import sys
 import csv
 import time
 import json
 import math
+import functools
 import argparse
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Any, Optional, Iterable, Tuple
 import urllib.parse
 import requests
+import token_cache
 
 ###
 
@@ -35,10 +32,16 @@ def _must_env(name: str) -> str:
     return v
 
 def get_token() -> str:
+    client_id = _must_env("PRISMASASE_CLIENT_ID")
+    tsg_id = _must_env("PRISMASASE_TSG_ID")
+    # Reuse the token from a previous run until shortly before it expires
+    cached = token_cache.load(client_id, tsg_id)
+    if cached:
+        return cached
     data = {
-        "client_id": _must_env("PRISMASASE_CLIENT_ID"),
+        "client_id": client_id,
         "client_secret": _must_env("PRISMASASE_CLIENT_SECRET"),
-        "scope": f"tsg_id:{_must_env('PRISMASASE_TSG_ID')}",
+        "scope": f"tsg_id:{tsg_id}",
         "grant_type": "client_credentials",
     }
     r = requests.post(
@@ -48,14 +51,18 @@ def get_token() -> str:
         timeout=30,
     )
     r.raise_for_status()
-    return r.json()["access_token"]
+    body = r.json()
+    token_cache.save(client_id, tsg_id, body["access_token"], body.get("expires_in"))
+    return body["access_token"]
 
+# One dict per token instead of one per request; requests merges it without mutating it
+@functools.lru_cache(maxsize=2)
 def get_headers(token: str) -> Dict[str, str]:
     return {
         "accept": "application/json",
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json",
-        "x-panw-region": "de",  # adjust if your tenant region differs
+        "x-panw-region": os.getenv("PRISMASASE_REGION", "de"),
     }
 def get_profile(token: str) -> Dict[str, Any]:
     prof = api_get("/sdwan/v2.1/api/profile", token)
@@ -65,6 +72,10 @@ def get_profile(token: str) -> Dict[str, Any]:
 def api_get(ep: str, token: str, params: Optional[Dict[str, Any]] = None) -> Any:
     url = ep if ep.startswith("http") else f"{BASE_API_URL}{ep}"
     r = requests.get(url, headers=get_headers(token), params=params, timeout=60)
+    if r.status_code == 401:
+        # Cached token was revoked early: drop it and retry once with a fresh one
+        token_cache.invalidate(_must_env("PRISMASASE_CLIENT_ID"), _must_env("PRISMASASE_TSG_ID"))
+        r = requests.get(url, headers=get_headers(get_token()), params=params, timeout=60)
     r.raise_for_status()
     if not r.text.strip():
         return None
@@ -76,6 +87,10 @@ def api_get(ep: str, token: str, params: Optional[Dict[str, Any]] = None) -> Any
 def api_post(ep: str, token: str, payload: Dict[str, Any]) -> Any:
     url = ep if ep.startswith("http") else f"{BASE_API_URL}{ep}"
     r = requests.post(url, headers=get_headers(token), json=payload, timeout=60)
+    if r.status_code == 401:
+        # Cached token was revoked early: drop it and retry once with a fresh one
+        token_cache.invalidate(_must_env("PRISMASASE_CLIENT_ID"), _must_env("PRISMASASE_TSG_ID"))
+        r = requests.post(url, headers=get_headers(get_token()), json=payload, timeout=60)
     r.raise_for_status()
     if not r.text.strip():
         return None
@@ -83,13 +98,6 @@ def api_post(ep: str, token: str, payload: Dict[str, Any]) -> Any:
         return r.json()
     except json.JSONDecodeError:
         return r.text
-    def get_headers(token):
-        return {
-        'accept': 'application/json',
-        'Authorization': f'Bearer {token}',
-        'Content-Type': 'application/json',
-        'X-PANW-Region': 'de'
-        }
 if __name__ == "__main__":
    
     token = get_token()
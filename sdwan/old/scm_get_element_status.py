@@ -6,14 +6,19 @@
 
 #!/usr/bin/env python3
 from __future__ import annotations
-import os, sys, json, time
-from typing import Dict, List, Any, Optional
+import os, sys, json, time, contextlib
+from typing import Dict, Any, Optional, Iterator
 import requests
+from api_common import make_session
 
 # Auth + API base
 AUTH_URL = os.getenv("PRISMASASE_AUTH_URL", "https://auth.apps.paloaltonetworks.com/oauth2/access_token")
 BASE_API_URL = os.getenv("SASE_BASE_URL", "https://api.sase.paloaltonetworks.com")
 
+# Shared keep-alive session with retries on transient errors
+# Auth headers are set on it once in main() instead of being passed per call.
+SESSION = make_session(pool_connections=16, pool_maxsize=32)
+
 def get_env_variable(name: str) -> str:
     v = os.getenv(name)
     if not v:
@@ -30,7 +35,7 @@ def get_token() -> str:
         "client_secret": client_secret,
         "scope": f"tsg_id:{tsg_id}",
     }
-    r = requests.post(
+    r = SESSION.post(
         AUTH_URL,
         headers={"Content-Type": "application/x-www-form-urlencoded"},
         data=data, timeout=30
@@ -58,7 +63,7 @@ def get_headers(token: str) -> Dict[str,str]:
     return headers
 
 # ----- keep profile call (non-fatal if it fails)
-def get_profile(session: requests.Session, headers: Dict[str,str]) -> Optional[Dict[str,Any]]:
+def get_profile(session: requests.Session, headers: Optional[Dict[str,str]] = None) -> Optional[Dict[str,Any]]:
     urls = [
         f"{BASE_API_URL}/sdwan/v2.5/api/tenants/self",
         f"{BASE_API_URL}/sdwan/v2.1/api/profile",
@@ -86,9 +91,10 @@ MACHINE_FIELDS = [
     "suspend_state",
 ]
 
-def list_machines(session: requests.Session, headers: Dict[str,str]) -> List[Dict[str,Any]]:
+def iter_machines(session: requests.Session, headers: Optional[Dict[str,str]] = None) -> Iterator[Dict[str,Any]]:
+    """Yields machines page by page so only one page is held in memory at a time."""
     url = f"{BASE_API_URL}/sdwan/v2.5/api/machines"
-    items: List[Dict[str,Any]] = []
+    fetched = 0
     params = {"limit": 200}
 
     while True:
@@ -106,21 +112,24 @@ def list_machines(session: requests.Session, headers: Dict[str,str]) -> List[Dic
             next_token = data.get("next") or (data.get("page", {}) or {}).get("next")
             total = data.get("total") or data.get("totalCount")
 
-        items.extend(page)
+        fetched += len(page)
+        yield from page
 
+        # Prefer the cursor: offset paging re-scans server-side and can skip or repeat rows
         if next_token:
             params = {"limit": 200, "cursor": next_token}
             continue
-        if total is not None and len(items) < int(total):
-            params = {"limit": 200, "offset": len(items)}
+        if total is not None and fetched < int(total):
+            params = {"limit": 200, "offset": fetched}
             continue
         break
 
-    return items
+_MACHINE_KEYS = tuple(MACHINE_FIELDS)
 
 def extract_machine_status(m: Dict[str,Any]) -> Dict[str,Any]:
-    out = {k: m.get(k) for k in MACHINE_FIELDS}
-    if out.get("manufacture_id") is None and "manufacturer_id" in m:
+    # map(m.get, ...) keeps the per-field lookups in C; missing keys still come back as None
+    out = dict(zip(_MACHINE_KEYS, map(m.get, _MACHINE_KEYS)))
+    if out["manufacture_id"] is None and "manufacturer_id" in m:
         out["manufacture_id"] = m.get("manufacturer_id")
     return out
 
@@ -131,35 +140,46 @@ def main() -> int:
         print(f"[error] auth failed: {e}", file=sys.stderr)
         return 1
 
-    headers = get_headers(token)
+    SESSION.headers.update(get_headers(token))
+    _ = get_profile(SESSION)
 
-    with requests.Session() as s:
-        _ = get_profile(s, headers)
+    cols = MACHINE_FIELDS
+    out_path = "machines_status.json"
+    tmp_path = out_path + ".tmp"
+    count = 0
+    try:
+        # Stream each page straight to the table and the JSON file instead of
+        # collecting every machine first; the file is renamed into place at the end.
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(f'{{"generated_at":{int(time.time())},"machines":[')
+            for m in iter_machines(SESSION):
+                row = extract_machine_status(m)
+                if count == 0:
+                    print("\n=== Machines status ===")
+                    print(" | ".join(cols))
+                    print("-" * (len(" | ".join(cols)) + 2))
+                else:
+                    f.write(",")
+                # compact separators, no indent: stays on the C encoder
+                f.write("\n" + json.dumps(row, ensure_ascii=False, separators=(",", ":")))
+                print(" | ".join(str(row.get(c, "")) for c in cols))
+                count += 1
+            f.write(f'\n],"count":{count}}}\n')
+    except Exception as e:
+        # open() itself may have failed; never mask the real error
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        print(f"[error] fetching machines: {e}", file=sys.stderr)
+        return 1
 
-        try:
-            machines = list_machines(s, headers)
-        except Exception as e:
-            print(f"[error] fetching machines: {e}", file=sys.stderr)
-            return 1
-
-        if not machines:
-            print("[info] no machines returned.")
-            return 0
-
-        rows = [extract_machine_status(m) for m in machines]
-
-        cols = MACHINE_FIELDS
-        print("\n=== Machines status ===")
-        print(" | ".join(cols))
-        print("-" * (len(" | ".join(cols)) + 2))
-        for r in rows:
-            print(" | ".join(str(r.get(c, "")) for c in cols))
-
-        out = {"generated_at": int(time.time()), "count": len(rows), "machines": rows}
-        with open("machines_status.json", "w", encoding="utf-8") as f:
-            json.dump(out, f, indent=2, ensure_ascii=False)
-        print(f"\n[ok] wrote machines_status.json with {len(rows)} entries.")
+    if not count:
+        os.remove(tmp_path)
+        print("[info] no machines returned.")
         return 0
 
+    os.replace(tmp_path, out_path)
+    print(f"\n[ok] wrote {out_path} with {count} entries.")
+    return 0
+
 if __name__ == "__main__":
     raise SystemExit(main())
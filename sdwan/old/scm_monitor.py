@@ -3,16 +3,23 @@
 # Copyright (c) 2025 Vladimir F de Sousa - vfrancad@gmail.com
 # Disclaimer: Personal project by a Palo Alto Networks employee.
 # Not an official PANW product. No support/warranty. See DISCLAIMER.md.
+# Set PRISMASASE_REGION to your tenant region (e.g. us, de); defaults to de.
 import os
-import json
 import argparse
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import requests
+import token_cache
+from api_common import make_session
 
 AUTH_URL = "https://auth.apps.paloaltonetworks.com/oauth2/access_token"
 BASE_API_URL = "https://api.sase.paloaltonetworks.com"
+MAX_WORKERS = 16  # concurrent WAN interface lookups; stays within the session pool
+
+# Shared keep-alive session with retries on transient errors
+# Auth headers are set on it once in main() instead of being rebuilt per call.
+SESSION = make_session(pool_connections=16, pool_maxsize=32, retry_posts=True)  # the POSTs here are read-only queries
 
 def get_env_variable(name):
     value = os.getenv(name)
@@ -24,32 +31,44 @@ def get_token():
     client_id = get_env_variable("CLIENT_ID")
     client_secret = get_env_variable("CLIENT_SECRET")
     tenant_id = get_env_variable("TENANT_ID")
+    # Reuse the token from a previous run until shortly before it expires
+    cached = token_cache.load(client_id, tenant_id)
+    if cached:
+        return cached
     data_payload = {
         "client_id": client_id,
         "client_secret": client_secret,
         "scope": f"tsg_id:{tenant_id}",
         "grant_type": "client_credentials"
     }
-    response = requests.post(
+    response = SESSION.post(
         AUTH_URL,
         headers={"Content-Type": "application/x-www-form-urlencoded"},
         data=data_payload,
         timeout=30,
     )
     response.raise_for_status()
-    return response.json()["access_token"]
+    body = response.json()
+    token_cache.save(client_id, tenant_id, body["access_token"], body.get("expires_in"))
+    return body["access_token"]
 
 def get_headers(token):
     return {
         "accept": "application/json",
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json",
-        "x-panw-region": "de",
+        "x-panw-region": os.getenv("PRISMASASE_REGION", "de"),
     }
 
-def get_profile(token):
+def get_profile():
     profile_url = f"{BASE_API_URL}/sdwan/v2.1/api/profile"
-    resp = requests.get(profile_url, headers=get_headers(token), timeout=30)
+    resp = SESSION.get(profile_url, timeout=30)
+    if resp.status_code == 401:
+        # Cached token was revoked early: drop it, log in again and retry once
+        token_cache.invalidate(get_env_variable("CLIENT_ID"), get_env_variable("TENANT_ID"))
+        SESSION.headers.pop("Authorization", None)
+        SESSION.headers.update(get_headers(get_token()))
+        resp = SESSION.get(profile_url, timeout=30)
     print("profile api status:", resp.status_code)
     return resp  # you weren’t using the body here; keeping as Response
 
@@ -62,6 +81,14 @@ def _to_iso_utc(dt: datetime) -> str:
         dt = dt.astimezone(timezone.utc)
     return dt.isoformat().replace("+00:00", "Z")
 
+_FALLBACK_TIME_FORMATS = (
+    "%Y-%m-%dT%H:%M:%S%z",
+    "%Y-%m-%d %H:%M:%S%z",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d",
+)
+
 def _parse_user_time(s: str) -> datetime:
     """
     Accepts:
@@ -76,23 +103,24 @@ def _parse_user_time(s: str) -> datetime:
     # normalize Z
     if s.endswith("Z"):
         s = s[:-1] + "+00:00"
-    # try a few common formats
-    fmts = (
-        "%Y-%m-%dT%H:%M:%S%z",
-        "%Y-%m-%d %H:%M:%S%z",
-        "%Y-%m-%dT%H:%M:%S",
-        "%Y-%m-%d %H:%M:%S",
-        "%Y-%m-%d",
-    )
-    for f in fmts:
-        try:
-            dt = datetime.strptime(s, f)
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return dt.astimezone(timezone.utc)
-        except ValueError:
-            continue
-    raise ValueError(f"Unrecognized time format: {s}")
+    # fromisoformat covers all the documented forms in one C-level call
+    try:
+        dt = datetime.fromisoformat(s)
+    except ValueError:
+        dt = None
+    if dt is None:
+        # unusual inputs only: try the strptime formats one by one
+        for f in _FALLBACK_TIME_FORMATS:
+            try:
+                dt = datetime.strptime(s, f)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError(f"Unrecognized time format: {s}")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
 
 def resolve_window(args) -> Tuple[str, str]:
     """
@@ -125,7 +153,7 @@ def resolve_window(args) -> Tuple[str, str]:
 
 # ---------- API calls (now parameterized) ----------
 
-def call_alarms(token, start_time_iso: str, end_time_iso: str):
+def call_alarms(start_time_iso: str, end_time_iso: str):
     url = f"{BASE_API_URL}/sdwan/v3.6/api/events/query"
     payload = {
         "limit": {"count": 50, "sort_on": "time", "sort_order": "descending"},
@@ -138,19 +166,19 @@ def call_alarms(token, start_time_iso: str, end_time_iso: str):
         "start_time": start_time_iso,
         "end_time": end_time_iso,
     }
-    resp = requests.post(url, headers=get_headers(token), data=json.dumps(payload), timeout=60)
+    resp = SESSION.post(url, json=payload, timeout=60)
     print("alarms api status:", resp.status_code)
     return resp
 
-def call_appdefs(token):
+def call_appdefs():
     url = f"{BASE_API_URL}/sdwan/v2.6/api/appdefs"
-    resp = requests.get(url, headers=get_headers(token), timeout=60)
+    resp = SESSION.get(url, timeout=60)
     print("appdefs api status:", resp.status_code)
     if not resp.ok:
         return []
     return resp.json().get("items", [])
 
-def call_aiops_health(token, start_time_iso: str, end_time_iso: str):
+def call_aiops_health(start_time_iso: str, end_time_iso: str):
     aiops_url = f"{BASE_API_URL}/sdwan/monitor/v2.0/api/monitor/aiops/health"
     aiops_payload = {
     "end_time": "2025-06-02T00:00:00Z",
@@ -160,14 +188,12 @@ def call_aiops_health(token, start_time_iso: str, end_time_iso: str):
     "view": "summary"
     }
     #print("GET aiops_url = ",aiops_url)
-    headers = get_headers(token)
-    #print("X-PANW-Region: ",headers["X-PANW-Region"])
-    resp = requests.post(aiops_url, headers=headers, data=json.dumps(aiops_payload))
+    resp = SESSION.post(aiops_url, json=aiops_payload)
     print("aiops api status:", resp.status_code)
     #print("aiops api response:", resp.text)
     return resp
 
-def call_applicationsummary(token, start_time_iso: str, end_time_iso: str):
+def call_applicationsummary(start_time_iso: str, end_time_iso: str):
     url = f"{BASE_API_URL}/sdwan/monitor/v2.0/api/monitor/applicationsummary/query"
     payload =  {
         "start_time": start_time_iso,
@@ -179,12 +205,12 @@ def call_applicationsummary(token, start_time_iso: str, end_time_iso: str):
             "site": ["1741378371338024045"]  # TODO: parameterize if needed
         }
     }
-    resp = requests.post(url, headers=get_headers(token), data=json.dumps(payload), timeout=60)
+    resp = SESSION.post(url, json=payload, timeout=60)
     print("applicationsummary api status:", resp.status_code)
     # print("applicationsummary api response:", resp.text)
     return resp
 
-def call_aggregatebandwidth(token, start_time_iso: str, end_time_iso: str):
+def call_aggregatebandwidth(start_time_iso: str, end_time_iso: str):
     url = f"{BASE_API_URL}/sdwan/monitor/v2.0/api/monitor/aggregatebandwidth/query"
     payload = {
         "start_time": start_time_iso,
@@ -193,13 +219,29 @@ def call_aggregatebandwidth(token, start_time_iso: str, end_time_iso: str):
         "metrics": ["AggBandwidthUsage"],
         "view": "duration"
     }
-    resp = requests.post(url, headers=get_headers(token), data=json.dumps(payload), timeout=60)
+    resp = SESSION.post(url, json=payload, timeout=60)
     print("aggregatebandwidth api status:", resp.status_code)
     return resp
 
-def get_all_interfaces_status(token):
+def fetch_wan_interfaces(site: Tuple[str, str]):
+    site_id, site_name = site
+    wan_url = f"{BASE_API_URL}/sdwan/v2.8/api/sites/{site_id}/waninterfaces"
+    wresp = SESSION.get(wan_url, timeout=60)
+    if wresp.status_code != 200:
+        return site, None
+    return site, [wi["id"] for wi in wresp.json().get("items", []) if wi.get("id")]
+
+def fetch_status(pair: Tuple[str, str]):
+    site_id, wi_id = pair
+    status_url = f"{BASE_API_URL}/sdwan/v2.1/api/sites/{site_id}/waninterfaces/{wi_id}/status"
+    sresp = SESSION.get(status_url, timeout=60)
+    if sresp.status_code != 200:
+        return None
+    return sresp.json().get("operational_state", "N/A")
+
+def get_all_interfaces_status():
     sites_url = f"{BASE_API_URL}/sdwan/v4.11/api/sites"
-    resp = requests.get(sites_url, headers=get_headers(token), timeout=60)
+    resp = SESSION.get(sites_url, timeout=60)
     if resp.status_code != 200:
         print(f"Failed to fetch sites. Status code: {resp.status_code}")
         print(resp.text)
@@ -208,35 +250,26 @@ def get_all_interfaces_status(token):
     data = resp.json()
     sites = data.get("items", data if isinstance(data, list) else [])
     print(f"Found {len(sites)} sites\n")
+    sites = [(site["id"], site.get("name")) for site in sites if site.get("id")]
 
-    for site in sites:
-        site_id = site.get("id")
-        site_name = site.get("name")
-        if not site_id:
-            continue
+    # Per-site and per-interface GETs are independent; fan them out over the shared
+    # session and print only once everything is back so the output order is stable.
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        site_wans = list(executor.map(fetch_wan_interfaces, sites))
+        pairs = [(site[0], wi_id) for site, wi_ids in site_wans for wi_id in wi_ids or ()]
+        statuses = dict(zip(pairs, executor.map(fetch_status, pairs)))
 
-        wan_url = f"{BASE_API_URL}/sdwan/v2.8/api/sites/{site_id}/waninterfaces"
-        wresp = requests.get(wan_url, headers=get_headers(token), timeout=60)
-        if wresp.status_code != 200:
+    for (site_id, site_name), wi_ids in site_wans:
+        if wi_ids is None:
             print(f"  Failed to get WAN interfaces for site {site_name} ({site_id})")
             continue
 
-        wan_interfaces = wresp.json().get("items", [])
-        print(f"Site: {site_name} ({site_id}) - {len(wan_interfaces)} WAN interfaces")
-
-        for wi in wan_interfaces:
-            wi_id = wi.get("id")
-            if not wi_id:
-                continue
-
-            status_url = f"{BASE_API_URL}/sdwan/v2.1/api/sites/{site_id}/waninterfaces/{wi_id}/status"
-            sresp = requests.get(status_url, headers=get_headers(token), timeout=60)
-            if sresp.status_code != 200:
+        print(f"Site: {site_name} ({site_id}) - {len(wi_ids)} WAN interfaces")
+        for wi_id in wi_ids:
+            operational_status = statuses[(site_id, wi_id)]
+            if operational_status is None:
                 print(f"    Failed to get status for interface {wi_id}")
                 continue
-
-            status_json = sresp.json()
-            operational_status = status_json.get("operational_state", "N/A")
             print(f"    WAN Interface {wi_id}: Operational Status: {operational_status}")
         print()
 
@@ -256,12 +289,18 @@ if __name__ == '__main__':
     # auth/profile
     _tenant_id = get_env_variable("TENANT_ID")
     token = get_token()
-    get_profile(token)
-
-    # calls (now parameterized with the window)
-    call_alarms(token, start_iso, end_iso)
-    call_appdefs(token)
-    call_aiops_health(token, start_iso, end_iso)
-    call_applicationsummary(token, start_iso, end_iso)
-    call_aggregatebandwidth(token, start_iso, end_iso)
-    get_all_interfaces_status(token)
+    SESSION.headers.update(get_headers(token))
+    get_profile()
+
+    # calls (now parameterized with the window); independent, so run them side by side
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [
+            executor.submit(call_alarms, start_iso, end_iso),
+            executor.submit(call_appdefs),
+            executor.submit(call_aiops_health, start_iso, end_iso),
+            executor.submit(call_applicationsummary, start_iso, end_iso),
+            executor.submit(call_aggregatebandwidth, start_iso, end_iso),
+        ]
+        for future in as_completed(futures):
+            future.result()
+    get_all_interfaces_status()
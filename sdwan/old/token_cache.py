@@ -0,0 +1,45 @@
+import os
+import json
+import time
+import hashlib
+from typing import Optional
+
+# ---------- Constants ----------
+CACHE_DIR = os.path.expanduser("~/.cache/prismasase")
+TOKEN_REFRESH_MARGIN = 60  # seconds before expiry at which a cached token is renewed
+DEFAULT_EXPIRES_IN = 1800  # used when the auth response carries no expires_in
+
+# ---------- Helpers ----------
+def _cache_file(client_id: str, tsg_id: str) -> str:
+    # One file per client/tenant pair; the name never contains the credentials themselves
+    key = hashlib.sha256(f"{client_id}|{tsg_id}".encode()).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"token_{key}.json")
+
+def load(client_id: str, tsg_id: str) -> Optional[str]:
+    """Returns the cached access token if it is still valid, else None."""
+    try:
+        with open(_cache_file(client_id, tsg_id)) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() >= cached.get("exp", 0) - TOKEN_REFRESH_MARGIN:
+        return None
+    return cached.get("access_token")
+
+def save(client_id: str, tsg_id: str, access_token: str, expires_in: Optional[int] = None):
+    path = _cache_file(client_id, tsg_id)
+    cached = {"access_token": access_token, "exp": int(time.time()) + int(expires_in or DEFAULT_EXPIRES_IN)}
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # 0600: the bearer token is a credential
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(cached, f)
+    except OSError as e:
+        print(f"[!] Could not write token cache: {e}")
+
+def invalidate(client_id: str, tsg_id: str):
+    try:
+        os.remove(_cache_file(client_id, tsg_id))
+    except OSError:
+        pass
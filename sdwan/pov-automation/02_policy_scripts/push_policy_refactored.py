@@ -75,6 +75,8 @@ def push_policy_performance(cgx_session, loaded_config, dryrun=False):
     existing = {i["name"]: i["id"] for i in cgx_session.get.perfmgmtpolicysets().cgx_content.get("items", [])}
 
     perf_sets = loaded_config.get("performance_sets", [])
+    # Accept both a name -> config mapping and the older list of single-key maps
+    if isinstance(perf_sets, dict): perf_sets = [{name: conf} for name, conf in perf_sets.items()]
     if not perf_sets: return
 
     for set_entry in perf_sets:
@@ -3099,6 +3099,8 @@ def push_policy_performance(cgx_session, loaded_config):
 
     perf_sets_ctrl = {i["name"]: i for i in perf_sets_resp.cgx_content.get("items", [])}
     perf_sets_yaml = loaded_config.get("performance_sets", [])
+    # Accept both a name -> config mapping and the older list of single-key maps
+    if isinstance(perf_sets_yaml, dict): perf_sets_yaml = [{name: conf} for name, conf in perf_sets_yaml.items()]
 
     for entry in perf_sets_yaml:
         set_name = list(entry.keys())[0]
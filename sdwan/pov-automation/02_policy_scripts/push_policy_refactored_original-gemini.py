@@ -11,12 +11,32 @@ Use pull_policy.py to generate the YAML file.
 
 import yaml
 import json
+import asyncio
 import sys
 import os
 import copy
 import argparse
 import datetime
+import hashlib
+import logging
+import logging.handlers
+import pickle
+from concurrent.futures import ThreadPoolExecutor
 from dictdiffer import diff
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# orjson is optional; used for fast canonical payload serialization when installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Prefer the libyaml-backed loader when available
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
 try:
     from prisma_sase import API
@@ -41,6 +61,31 @@ sdk.interactive.login_secret(
     tsg_id=PRISMASASE_TSG_ID
 )
 
+# Keep-alive connection pool on the SDK's HTTP session, sized for the concurrent pushes
+sdk_http_session = sdk.expose_session() if hasattr(sdk, "expose_session") else getattr(sdk, "_session", None)
+if sdk_http_session is not None:
+    # Only enlarge the pool; keep the SDK's retry policy (429/5xx, Retry-After) when it set one
+    sdk_retry = sdk_http_session.get_adapter("https://").max_retries
+    if not sdk_retry.status_forcelist:
+        # allowed_methods=None: like the SDK, also retry POST/PUT/DELETE on rate limits and gateway errors
+        sdk_retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504], allowed_methods=None,
+                          respect_retry_after_header=True, raise_on_status=False)
+    sdk_http_session.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=sdk_retry))
+
+# Record controller writes so a warm-start snapshot is never saved after the tenant changed
+WRITE_METHODS = frozenset(["POST", "PUT", "PATCH", "DELETE"])
+controller_writes = 0
+
+
+def track_writes(response, *args, **kwargs):
+    global controller_writes
+    if response.request.method in WRITE_METHODS and "/sdwan/" in response.request.url:
+        controller_writes += 1
+
+
+if sdk_http_session is not None:
+    sdk_http_session.hooks["response"].append(track_writes)
+
 cgx_session = sdk
 
 
@@ -143,6 +188,26 @@ perfmgmtpolicyset_name_config = {}
 perfmgmtpolicystack_name_config = {}
 perf_threshold_name_id = {}
 
+# Translation dicts persisted by the warm-start snapshot (all module-level dicts above)
+SNAPSHOT_DICTS = [name for name, value in list(globals().items())
+                  if isinstance(value, dict) and not name.startswith("__")]
+SNAPSHOT_FILE_PATTERN = os.path.join(os.path.expanduser("~"), ".cgx_policy_snapshot_{}_{}.pkl")
+
+# Buffered logger for the per-object NAT/Performance progress messages.
+# Records are written out in batches of 100, or straight away on errors.
+log_stream_handler = logging.StreamHandler(sys.stdout)
+log_stream_handler.setFormatter(logging.Formatter("%(message)s"))
+log_buffer = logging.handlers.MemoryHandler(capacity=100, flushLevel=logging.ERROR, target=log_stream_handler)
+logger = logging.getLogger(__name__)
+logger.addHandler(log_buffer)
+logger.setLevel(logging.INFO)
+logger.propagate = False
+
+# Upper bound on in-flight API calls when independent rules/stacks are pushed concurrently
+MAX_CONCURRENT_REQUESTS = 20
+# Worker threads used to issue independent orphan DELETEs in parallel
+MAX_DELETE_WORKERS = 16
+
 def create_global_dicts_performance(cgx_session):
     """
     Scouts the live Prisma SD-WAN controller to build Name-to-ID memory maps
@@ -207,6 +272,10 @@ NAT_POLICY_STACKS = "natpolicysetstacks"
 NAT_POLICY_SETS = "natpolicysets"
 NAT_POLICY_RULES = "natpolicyrules"
 
+# Default Rule Policy Set naming for (Simple) stacks
+SIMPLE_SUFFIX = " (Simple)"
+DEFAULT_RULESET_SUFFIX = " Default Rule Policy Set (Simple)"
+
 NATACTIONS_name_enum = {
     "No NAT": "no_nat",
     "Source NAT": "source_nat_dynamic",
@@ -1050,6 +1119,141 @@ def create_global_dicts_security(cgx_session):
     return
 
 
+#
+# Warm-start snapshot of the controller translation dicts, one file per tenant
+# and policy type. Keyed by a fingerprint of the top-level policy collections
+# (id + _etag + _updated_on_utc of every item), so only the per-set rule GETs in
+# create_global_dicts_* are skipped. Performance has no per-set GETs to skip, so
+# it is never snapshotted. The snapshot is written after the push, and only when
+# the push sent no writes to the controller; any write removes it so the next
+# run rebuilds from the controller.
+#
+SNAPSHOT_COLLECTIONS = {
+    PATH: ["appdefs", "networkcontexts", "networkpolicyglobalprefixes", "networkpolicylocalprefixes_t",
+           "waninterfacelabels", "networkpolicysetstacks", "networkpolicysets", "servicelabels"],
+    QOS: ["appdefs", "networkcontexts", "prioritypolicyglobalprefixes", "prioritypolicylocalprefixes_t",
+          "prioritypolicysetstacks", "prioritypolicysets"],
+    NAT: ["natzones", "natpolicypools", "natglobalprefixes", "natlocalprefixes_t",
+          "natpolicysetstacks", "natpolicysets"],
+    SECURITY: ["appdefs", "ngfwsecuritypolicyglobalprefixes", "ngfwsecuritypolicylocalprefixes_t",
+               "ngfwsecuritypolicysetstacks", "ngfwsecuritypolicysets", "securityzones"],
+}
+SNAPSHOT_COLLECTIONS[ALL] = sorted(set(name for names in SNAPSHOT_COLLECTIONS.values() for name in names)
+                                   | {"perfmgmtthresholdprofiles"})
+
+
+def snapshot_file(tenant_id, policytype):
+    return SNAPSHOT_FILE_PATTERN.format(tenant_id, policytype)
+
+
+def get_policy_version(cgx_session, policytype):
+    fingerprint = hashlib.sha256()
+    for collection in SNAPSHOT_COLLECTIONS[policytype]:
+        resp = getattr(cgx_session.get, collection)()
+        if not resp.cgx_status:
+            print("ERR: Could not retrieve {}. Snapshot not used".format(collection))
+            print(resp.cgx_content)
+            return None
+
+        items = resp.cgx_content.get("items", None) or []
+        versions = sorted((str(item.get("id")), str(item.get("_etag")), str(item.get("_updated_on_utc")))
+                          for item in items)
+        fingerprint.update(repr((collection, versions)).encode())
+
+    return fingerprint.hexdigest()
+
+
+def load_snapshot(snapshot_key):
+    filename = snapshot_file(snapshot_key[0], snapshot_key[1])
+    if not os.path.exists(filename):
+        return False
+
+    # Any unreadable or foreign pickle just means a full fetch
+    try:
+        with open(filename, "rb") as snapshotfile:
+            snapshot = pickle.load(snapshotfile)
+        if snapshot.get("key") != snapshot_key:
+            return False
+        snapshot_dicts = dict(snapshot.get("dicts", {}))
+    except Exception as e:
+        print("WARN: Could not read snapshot {}: {}".format(filename, e))
+        return False
+
+    for name, value in snapshot_dicts.items():
+        if name in SNAPSHOT_DICTS:
+            globals()[name].update(value)
+
+    return True
+
+
+def save_snapshot(snapshot_key):
+    filename = snapshot_file(snapshot_key[0], snapshot_key[1])
+    snapshot = {
+        "key": snapshot_key,
+        "dicts": {name: globals()[name] for name in SNAPSHOT_DICTS}
+    }
+    try:
+        with open(filename, "wb") as snapshotfile:
+            pickle.dump(snapshot, snapshotfile, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError as e:
+        print("WARN: Could not write snapshot {}: {}".format(filename, e))
+
+    return
+
+
+def remove_snapshot(tenant_id, policytype):
+    # A write by one type can change what ALL caches; a write by ALL can change any type
+    if policytype == ALL:
+        policytypes = list(SNAPSHOT_COLLECTIONS)
+    else:
+        policytypes = [policytype, ALL]
+
+    for snapshot_type in policytypes:
+        filename = snapshot_file(tenant_id, snapshot_type)
+        try:
+            os.remove(filename)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print("WARN: Could not remove snapshot {}: {}".format(filename, e))
+
+    return
+
+
+def create_global_dicts_cached(cgx_session, policytype, create_func, use_snapshot):
+    """
+    Fills the translation dicts, from the snapshot when the policy collections are
+    unchanged. Returns the snapshot key to pass to finish_snapshot() after the push.
+    """
+    if not use_snapshot or policytype not in SNAPSHOT_COLLECTIONS:
+        create_func(cgx_session=cgx_session)
+        return None
+
+    policy_version = get_policy_version(cgx_session, policytype)
+    if policy_version is None:
+        create_func(cgx_session=cgx_session)
+        return None
+
+    snapshot_key = (cgx_session.tenant_id, policytype, policy_version)
+    if load_snapshot(snapshot_key):
+        print("INFO: Policy objects unchanged. Loaded Translation Dicts from {}".format(
+            snapshot_file(cgx_session.tenant_id, policytype)))
+        return snapshot_key
+
+    create_func(cgx_session=cgx_session)
+    return snapshot_key
+
+
+def finish_snapshot(cgx_session, policytype, snapshot_key):
+    # Dicts only match the controller if the push changed nothing
+    if controller_writes or sdk_http_session is None:
+        remove_snapshot(cgx_session.tenant_id, policytype)
+    elif snapshot_key is not None:
+        save_snapshot(snapshot_key)
+
+    return
+
+
 def cleandata(data):
     tmp = data
     for key in DELETE_KEYS:
@@ -1920,7 +2124,22 @@ def find_diff(d1, d2, path=""):
 
 
 
+#
+# Hash a payload on its canonical JSON form so identical payloads can be grouped
+#
+def payload_hash(payload):
+    if orjson is not None:
+        canonical = orjson.dumps(payload, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    else:
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    return hashlib.blake2b(canonical, digest_size=16).hexdigest()
+
+
 def compareconf(origconf, curconf):
+    # Fast path: identical payloads need no dictdiffer walk
+    if origconf == curconf:
+        return []
+
     result = list(diff(origconf, curconf))
     resources_updated = []
     for item in result:
@@ -1943,6 +2162,29 @@ def compareconf(origconf, curconf):
     return resources_updated
 
 
+#
+# Translate the rules of every set, once per unique rule payload.
+# Sets cloned from one another carry identical rules, so these are grouped
+# by payload hash and the translated result is shared across the group.
+#
+def translate_rules_grouped(setconfig_yaml, rules_config_type, rule_type):
+    groups = {}
+    for setname, set_yaml in setconfig_yaml.items():
+        rules_yaml = extractfromyaml(loaded_config=set_yaml, config_type=rules_config_type)
+        if rules_yaml is None:
+            continue
+        for rulename, rule_yaml in rules_yaml.items():
+            groups.setdefault(payload_hash(rule_yaml), []).append((setname, rulename, rule_yaml))
+
+    translated = {setname: {} for setname in setconfig_yaml.keys()}
+    for members in groups.values():
+        rule_data = translate_rule(rule=members[0][2], action=N2ID, rule_type=rule_type)
+        for setname, rulename, _ in members:
+            translated[setname][rulename] = rule_data
+
+    return translated
+
+
 def extractfromyaml(loaded_config, config_type):
     if config_type not in loaded_config.keys():
         print("No configs found for {}. Skipping..".format(config_type))
@@ -2106,12 +2348,38 @@ def extractfromyaml(loaded_config, config_type):
 
         return config_clean
 
+#
+# Index the top-level YAML sections needed by a push function in a single walk.
+# Returns {config_type: {name: config}}, same shape as extractfromyaml.
+#
+def build_type_index(loaded_config, config_types):
+    index = {}
+    for config_type, configs in loaded_config.items():
+        if config_type not in config_types:
+            continue
+
+        config_clean = {}
+        for data in copy.deepcopy(configs) or []:
+            if not data: continue
+            name_key = list(data.keys())[0]
+            config_body = data[name_key]
+            config_body["name"] = name_key
+            config_clean[name_key] = config_body
+
+        index[config_type] = config_clean
+
+    for config_type in config_types:
+        if config_type not in index:
+            print("No configs found for {}. Skipping..".format(config_type))
+            index[config_type] = None
+
+    return index
+
 #
 # Function to update payload with contents of YAML for PUT operation
 #
 def update_payload(source, dest):
-    for key in source.keys():
-        dest[key] = source[key]
+    dest.update(source)
 
     return dest
 
@@ -2144,14 +2412,56 @@ def update_stack(stack_config):
     return stackconfig
 
 
+#
+# Run func over independent items concurrently.
+# The SDK is synchronous, so each call runs in a worker thread via asyncio.to_thread,
+# with a semaphore bounding the number of in-flight API calls.
+#
+async def gather_bounded(func, items):
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async def run_one(item):
+        async with semaphore:
+            return await asyncio.to_thread(func, item)
+
+    return await asyncio.gather(*[run_one(item) for item in items])
+
+
+def run_concurrent(func, items):
+    return asyncio.run(gather_bounded(func, items))
+
+
+#
+# Names of controller objects flagged as system defaults, which cleanup must never delete
+#
+def protected_names(name_config, default_flag):
+    return frozenset(name for name, ctrl_data in name_config.items() if ctrl_data.get(default_flag) is True)
+
+
+#
+# Delete orphaned objects in parallel. orphans is a list of (name, ctrl_data);
+# delete_call issues the DELETE for one ctrl_data.
+#
+def delete_orphans(delete_call, orphans, message):
+    def delete_one(orphan):
+        name, ctrl_data = orphan
+        delete_call(ctrl_data)
+        logger.info(message.format(name))
+
+    with ThreadPoolExecutor(max_workers=MAX_DELETE_WORKERS) as executor:
+        list(executor.map(delete_one, orphans))
+
+
 #
 # Update Path Policy, Rules & Stack Configs
 #
 def push_policy_path(cgx_session, loaded_config):
+    config_index = build_type_index(loaded_config=loaded_config, config_types=[NETWORK_POLICY_SETS, NETWORK_POLICY_STACKS])
+
     ############################################################################
     # Path Set
     ############################################################################
-    pathsetconfig_yaml = extractfromyaml(loaded_config=loaded_config, config_type=NETWORK_POLICY_SETS)
+    pathsetconfig_yaml = config_index[NETWORK_POLICY_SETS]
     for pathsetname in pathsetconfig_yaml.keys():
 
         set_yaml = pathsetconfig_yaml[pathsetname]
@@ -2277,13 +2587,13 @@ def push_policy_path(cgx_session, loaded_config):
     ############################################################################
     # Path Stack
     ############################################################################
-    pathstacktconfig_yaml = extractfromyaml(loaded_config=loaded_config, config_type=NETWORK_POLICY_STACKS)
+    pathstacktconfig_yaml = config_index[NETWORK_POLICY_STACKS]
     for pathstackname in pathstacktconfig_yaml.keys():
 
         stack_yaml = pathstacktconfig_yaml[pathstackname]
         # --- THE 3-LINE FIX FOR PATH STACKS ---
         # Force the script to use the Name so translate_stack fetches the fresh ID
-        expected_name = pathstackname.replace(" (Simple)", "") + " Default Rule Policy Set (Simple)"
+        expected_name = f"{pathstackname.removesuffix(SIMPLE_SUFFIX)}{DEFAULT_RULESET_SUFFIX}"
         stack_yaml["defaultrule_policyset_id"] = expected_name
         #
         stack_data_yaml = translate_stack(stack=stack_yaml, action=N2ID, stack_type=PATH)
@@ -2353,10 +2663,12 @@ def push_policy_path(cgx_session, loaded_config):
 # Update QoS Policy, Rules & Stack Configs
 
 def push_policy_qos(cgx_session, loaded_config):
+    config_index = build_type_index(loaded_config=loaded_config, config_types=[PRIORITY_POLICY_SETS, PRIORITY_POLICY_STACKS])
+
     ############################################################################
     # QoS Set
     ############################################################################
-    qossetconfig_yaml = extractfromyaml(loaded_config=loaded_config, config_type=PRIORITY_POLICY_SETS)
+    qossetconfig_yaml = config_index[PRIORITY_POLICY_SETS]
     for qossetname in qossetconfig_yaml.keys():
 
         set_yaml = qossetconfig_yaml[qossetname]
@@ -2550,7 +2862,7 @@ def push_policy_qos(cgx_session, loaded_config):
     ############################################################################
     # QoS Stack
     ############################################################################
-    qosstacktconfig_yaml = extractfromyaml(loaded_config=loaded_config, config_type=PRIORITY_POLICY_STACKS)
+    qosstacktconfig_yaml = config_index[PRIORITY_POLICY_STACKS]
     for qosstackname in qosstacktconfig_yaml.keys():
 
         stack_yaml = qosstacktconfig_yaml[qosstackname]
@@ -2558,7 +2870,7 @@ def push_policy_qos(cgx_session, loaded_config):
         # --- ADD THESE 3 LINES ---
         # Overwrite the dead YAML ID with the exact string NAME of the Default Rule Set.
         # This forces 'translate_stack' to fetch the brand new ID for us.
-        expected_name = qosstackname.replace(" (Simple)", "") + " Default Rule Policy Set (Simple)"
+        expected_name = f"{qosstackname.removesuffix(SIMPLE_SUFFIX)}{DEFAULT_RULESET_SUFFIX}"
         stack_yaml["defaultrule_policyset_id"] = expected_name
         # -------------------------
 
@@ -2636,16 +2948,23 @@ def push_policy_qos(cgx_session, loaded_config):
 
 ### Update Security Policy, Rules, Stack Configs
 def push_policy_security(cgx_session, loaded_config):
-    ngfwsetconfig_yaml = extractfromyaml(loaded_config=loaded_config, config_type=SECURITY_POLICY_SETS)
-    
+    config_index = build_type_index(loaded_config=loaded_config, config_types=[SECURITY_POLICY_SETS, SECURITY_POLICY_STACKS])
+
+    ngfwsetconfig_yaml = config_index[SECURITY_POLICY_SETS]
+
+    # Translate rules up front, once per unique payload across all sets
+    ngfwrules_translated = translate_rules_grouped(setconfig_yaml=ngfwsetconfig_yaml,
+                                                   rules_config_type=SECURITY_POLICY_RULES,
+                                                   rule_type=SECURITY)
+
     ############################################################################
     # 1. Security Set - Create & Update
     ############################################################################
     for ngfwsetname in ngfwsetconfig_yaml.keys():
         set_yaml = ngfwsetconfig_yaml[ngfwsetname]
         
-        # Extract rules and remove from set_yaml to avoid PUT/POST payload errors
-        rules_yaml = extractfromyaml(loaded_config=set_yaml, config_type=SECURITY_POLICY_RULES)
+        # Rules are already translated; remove them from set_yaml to avoid PUT/POST payload errors
+        rules_yaml = ngfwrules_translated[ngfwsetname]
         if SECURITY_POLICY_RULES in set_yaml.keys():
             del set_yaml[SECURITY_POLICY_RULES]
 
@@ -2661,7 +2980,7 @@ def push_policy_security(cgx_session, loaded_config):
                     rules_ctrl[rule["name"]] = rule
 
             for rulename in rules_yaml.keys():
-                rule_data_yaml = translate_rule(rule=rules_yaml[rulename], action=N2ID, rule_type=SECURITY)
+                rule_data_yaml = rules_yaml[rulename]
                 if rulename in rules_ctrl.keys():
                     rule_ctrl = rules_ctrl[rulename]
                     if len(compareconf(rule_data_yaml, rule_ctrl)) > 0:
@@ -2718,7 +3037,7 @@ def push_policy_security(cgx_session, loaded_config):
 
                 ngfwrule_name_id = {}
                 for rulename in rules_yaml.keys():
-                    rule_data_yaml = translate_rule(rule=rules_yaml[rulename], action=N2ID, rule_type=SECURITY)
+                    rule_data_yaml = rules_yaml[rulename]
                     
                     # If rule already exists (auto-generated), PUT. Otherwise, POST.
                     if rulename in rules_ctrl:
@@ -2746,12 +3065,12 @@ def push_policy_security(cgx_session, loaded_config):
     # 2. Security Stack - ID Swap & Create
     ############################################################################
     
-    ngfwstacktconfig_yaml = extractfromyaml(loaded_config=loaded_config, config_type=SECURITY_POLICY_STACKS)
+    ngfwstacktconfig_yaml = config_index[SECURITY_POLICY_STACKS]
     for nfgwstackname in ngfwstacktconfig_yaml.keys():
         stack_yaml = ngfwstacktconfig_yaml[nfgwstackname]
 
         # ID SWAP: Force translator to use the Name, so it fetches the live UUID
-        expected_name = nfgwstackname.replace(" (Simple)", "") + " Default Rule Policy Set (Simple)"
+        expected_name = f"{nfgwstackname.removesuffix(SIMPLE_SUFFIX)}{DEFAULT_RULESET_SUFFIX}"
         stack_yaml["defaultrule_policyset_id"] = expected_name
 
         stack_data_yaml = translate_stack(stack=stack_yaml, action=N2ID, stack_type=SECURITY)
@@ -2791,6 +3110,8 @@ def push_policy_security(cgx_session, loaded_config):
 
 ### Update Nat - NEW
 def push_policy_nat(cgx_session, loaded_config):
+    config_index = build_type_index(loaded_config=loaded_config, config_types=["natpolicysets", "natpolicysetstacks"])
+
     # Memory maps for the ID Handshake
     fresh_id_map = {}
     natpolicyset_id_name = {}
@@ -2799,16 +3120,16 @@ def push_policy_nat(cgx_session, loaded_config):
     ############################################################################
     # 1. NAT Set - Create & Update
     ############################################################################
-    natsetconfig_yaml = extractfromyaml(loaded_config=loaded_config, config_type="natpolicysets")
+    natsetconfig_yaml = config_index["natpolicysets"]
     if not natsetconfig_yaml:
-        print("INFO: No NAT Sets found in YAML.")
+        logger.info("INFO: No NAT Sets found in YAML.")
         natsetconfig_yaml = {}
 
     for natsetname, set_yaml in natsetconfig_yaml.items():
         # Handle rule formatting (list of dicts from the pull script)
         raw_rules = set_yaml.get("natpolicyrules", [])
-        if "natpolicyrules" in set_yaml:
-            del set_yaml["natpolicyrules"]
+        # Build the set payload as a shallow copy, leaving the loaded YAML untouched
+        set_payload = {k: v for k, v in set_yaml.items() if k != "natpolicyrules"}
             
         if isinstance(raw_rules, dict):
             rules_yaml_list = [{k: v} for k, v in raw_rules.items()]
@@ -2818,11 +3139,11 @@ def push_policy_nat(cgx_session, loaded_config):
         # Extract DUAL rule orders specific to NAT
         dst_order = set_yaml.get("destination_zone_policyrule_order", [])
         src_order = set_yaml.get("source_zone_policyrule_order", [])
-        set_yaml["destination_zone_policyrule_order"] = None
-        set_yaml["source_zone_policyrule_order"] = None
+        set_payload["destination_zone_policyrule_order"] = None
+        set_payload["source_zone_policyrule_order"] = None
 
         # GOLDEN RULE #1: The Clone Wiper
-        set_yaml["clone_from"] = None
+        set_payload["clone_from"] = None
 
         if natsetname in natpolicyset_name_config.keys():
             # --- EXISTING SET ---
@@ -2833,20 +3154,20 @@ def push_policy_nat(cgx_session, loaded_config):
             natpolicyset_id_name[set_id] = natsetname
             natpolicyset_name_id[natsetname] = set_id
 
-            if len(compareconf(set_yaml, set_ctrl)) > 0:
-                data = update_payload(set_yaml, set_ctrl)
+            if len(compareconf(set_payload, set_ctrl)) > 0:
+                data = update_payload(set_payload, set_ctrl)
                 # Strip order from payload so we don't trigger mismatch errors on PUT
                 if "destination_zone_policyrule_order" in data: del data["destination_zone_policyrule_order"]
                 if "source_zone_policyrule_order" in data: del data["source_zone_policyrule_order"]
                 
                 resp = cgx_session.put.natpolicysets(natpolicyset_id=set_id, data=data)
-                if resp.cgx_status: print(f"Updated NAT Set: {natsetname}")
+                if resp.cgx_status: logger.info(f"Updated NAT Set: {natsetname}")
 
         else:
             # --- NEW SET ---
-            resp = cgx_session.post.natpolicysets(data=set_yaml)
+            resp = cgx_session.post.natpolicysets(data=set_payload)
             if resp.cgx_status:
-                print(f"Created NAT Set: {natsetname}")
+                logger.info(f"Created NAT Set: {natsetname}")
                 set_id = resp.cgx_content.get("id")
                 
                 # MEMORY UPDATE
@@ -2854,7 +3175,7 @@ def push_policy_nat(cgx_session, loaded_config):
                 natpolicyset_id_name[set_id] = natsetname
                 natpolicyset_name_id[natsetname] = set_id
             else:
-                print(f"ERR: Could not create NAT Set {natsetname}: {resp.cgx_content}")
+                logger.error(f"ERR: Could not create NAT Set {natsetname}: {resp.cgx_content}")
                 continue
 
         ############################################################################
@@ -2868,18 +3189,18 @@ def push_policy_nat(cgx_session, loaded_config):
                 rules_ctrl[rule["name"]] = rule
 
         nat_rule_name_id = {}
-        rule_names_in_yaml = []
+        rule_names_in_yaml = set()
 
-        for r_entry in rules_yaml_list:
+        def push_nat_rule(r_entry):
             rulename = list(r_entry.keys())[0]
             rule_data = r_entry[rulename]
-            rule_names_in_yaml.append(rulename)
+            rule_names_in_yaml.add(rulename)
 
             # Standard Translation (Zones, Prefixes)
             try:
                 rule_data = translate_rule(rule=rule_data, action=N2ID, rule_type="nat")
-            except:
-                pass 
+            except (KeyError, TypeError, AttributeError) as e:
+                logger.debug("translate_rule fallback for {}: {}".format(rulename, e))
 
             if rulename in rules_ctrl:
                 # RULE EXISTS: PUT
@@ -2888,20 +3209,27 @@ def push_policy_nat(cgx_session, loaded_config):
                     r_payload = update_payload(rule_data, r_ctrl)
                     resp_rule = cgx_session.put.natpolicyrules(natpolicyset_id=set_id, natpolicyrule_id=r_payload["id"], data=r_payload)
                     if resp_rule.cgx_status:
-                        print(f"\tUpdated Rule: {rulename}")
+                        logger.info(f"\tUpdated Rule: {rulename}")
                         nat_rule_name_id[rulename] = r_payload["id"]
                     else:
-                        print(f"\tERR: Failed to update Rule {rulename}: {resp_rule.cgx_content}")
+                        logger.error(f"\tERR: Failed to update Rule {rulename}: {resp_rule.cgx_content}")
                 else:
                     nat_rule_name_id[rulename] = r_ctrl["id"]
             else:
                 # RULE MISSING: POST
                 resp_rule = cgx_session.post.natpolicyrules(natpolicyset_id=set_id, data=rule_data)
                 if resp_rule.cgx_status:
-                    print(f"\tCreated Rule: {rulename}")
+                    logger.info(f"\tCreated Rule: {rulename}")
                     nat_rule_name_id[rulename] = resp_rule.cgx_content.get("id")
                 else:
-                    print(f"\tERR: Failed to create Rule {rulename}: {resp_rule.cgx_content}")
+                    logger.error(f"\tERR: Failed to create Rule {rulename}: {resp_rule.cgx_content}")
+
+        # Concurrent POSTs land in any order; only safe when the order PUT below rewrites it
+        if dst_order or src_order:
+            run_concurrent(push_nat_rule, rules_yaml_list)
+        else:
+            for r_entry in rules_yaml_list:
+                push_nat_rule(r_entry)
 
         # Finalize DUAL Rule Order for New/Updated Sets
         if dst_order or src_order:
@@ -2915,32 +3243,34 @@ def push_policy_nat(cgx_session, loaded_config):
             })
 
         # Delete Orphaned Rules
-        for rulename, rule_data in rules_ctrl.items():
-            if rulename not in rule_names_in_yaml:
-                cgx_session.delete.natpolicyrules(natpolicyset_id=set_id, natpolicyrule_id=rule_data["id"])
-                print(f"\tDeleted Orphaned Rule: {rulename}")
+        delete_orphans(lambda rule_data: cgx_session.delete.natpolicyrules(natpolicyset_id=set_id, natpolicyrule_id=rule_data["id"]),
+                       orphans=[(rulename, rule_data) for rulename, rule_data in rules_ctrl.items()
+                                if rulename not in rule_names_in_yaml],
+                       message="\tDeleted Orphaned Rule: {}")
 
     ############################################################################
     # 2. NAT Stack - ID Swap & Create
     ############################################################################
-    natstackconfig_yaml = extractfromyaml(loaded_config=loaded_config, config_type="natpolicysetstacks")
+    natstackconfig_yaml = config_index["natpolicysetstacks"]
     if not natstackconfig_yaml:
         natstackconfig_yaml = {}
-        
-    for natstackname, stack_yaml in natstackconfig_yaml.items():
+
+    # Policy set name or old ID -> fresh ID, built once for the ID swap below
+    policyset_fresh_id = dict(fresh_id_map)
+    policyset_fresh_id.update({set_id: fresh_id_map.get(set_name, set_id) for set_id, set_name in natpolicyset_id_name.items()})
+
+    def push_nat_stack(stack_entry):
+        natstackname, stack_yaml = stack_entry
 
         # GOLDEN RULE #3: The ID Swap (NAT Stacks ONLY use policyset_ids)
         if stack_yaml.get("policyset_ids"):
-            new_ps_list = []
-            for item in stack_yaml["policyset_ids"]:
-                item_name = natpolicyset_id_name.get(str(item), item)
-                new_ps_list.append(fresh_id_map.get(item_name, item))
-            stack_yaml["policyset_ids"] = new_ps_list
+            stack_yaml["policyset_ids"] = [policyset_fresh_id.get(item, item) for item in stack_yaml["policyset_ids"]]
 
         try:
             stack_data_yaml = translate_stack(stack=stack_yaml, action=N2ID, stack_type="nat")
             stack_data_yaml = update_stack(stack_data_yaml)
-        except:
+        except (KeyError, TypeError, AttributeError) as e:
+            logger.debug("translate_stack fallback for {}: {}".format(natstackname, e))
             stack_data_yaml = stack_yaml
 
         if natstackname in natpolicystack_name_config.keys():
@@ -2948,34 +3278,38 @@ def push_policy_nat(cgx_session, loaded_config):
             if len(compareconf(stack_data_yaml, stack_ctrl)) > 0:
                 data = update_payload(stack_data_yaml, stack_ctrl)
                 resp = cgx_session.put.natpolicysetstacks(natpolicysetstack_id=data["id"], data=data)
-                if resp.cgx_status: print(f"Updated NAT Stack: {natstackname}")
+                if resp.cgx_status: logger.info(f"Updated NAT Stack: {natstackname}")
             else:
-                print(f"No Changes to NAT Stack: {natstackname}")
+                logger.info(f"No Changes to NAT Stack: {natstackname}")
         else:
             resp = cgx_session.post.natpolicysetstacks(data=stack_data_yaml)
-            if resp.cgx_status: print(f"Created NAT Stack: {natstackname}")
-            else: print(f"ERR: Could not create NAT Stack {natstackname}: {resp.cgx_content}")
+            if resp.cgx_status: logger.info(f"Created NAT Stack: {natstackname}")
+            else: logger.error(f"ERR: Could not create NAT Stack {natstackname}: {resp.cgx_content}")
+
+    run_concurrent(push_nat_stack, list(natstackconfig_yaml.items()))
 
     ############################################################################
     # 3. Cleanup - Safety Shields
     ############################################################################
     # GOLDEN RULE #4: Protect the Defaults
-    for name, ctrl_data in natpolicystack_name_config.items():
-        if ctrl_data.get("default_policysetstack") is True: continue
-        if name not in natstackconfig_yaml:
-            cgx_session.delete.natpolicysetstacks(natpolicysetstack_id=ctrl_data["id"])
-            print(f"Deleted Orphaned NAT Stack: {name}")
-
-    for name, ctrl_data in natpolicyset_name_config.items():
-        if ctrl_data.get("defaultrule_policyset") is True: continue
-        if name not in natsetconfig_yaml:
-            cgx_session.delete.natpolicysets(natpolicyset_id=ctrl_data["id"])
-            print(f"Deleted Orphaned NAT Set: {name}")
-
+    # Stacks go first, since they reference the sets
+    orphan_names = natpolicystack_name_config.keys() - protected_names(natpolicystack_name_config, "default_policysetstack") - natstackconfig_yaml.keys()
+    delete_orphans(lambda ctrl_data: cgx_session.delete.natpolicysetstacks(natpolicysetstack_id=ctrl_data["id"]),
+                   orphans=[(name, natpolicystack_name_config[name]) for name in orphan_names],
+                   message="Deleted Orphaned NAT Stack: {}")
+
+    orphan_names = natpolicyset_name_config.keys() - protected_names(natpolicyset_name_config, "defaultrule_policyset") - natsetconfig_yaml.keys()
+    delete_orphans(lambda ctrl_data: cgx_session.delete.natpolicysets(natpolicyset_id=ctrl_data["id"]),
+                   orphans=[(name, natpolicyset_name_config[name]) for name in orphan_names],
+                   message="Deleted Orphaned NAT Set: {}")
+
+    log_buffer.flush()
     return
 
 ##### PERFORMANCE POLICY - NEW
 def push_policy_performance(cgx_session, loaded_config):
+    config_index = build_type_index(loaded_config=loaded_config, config_types=["perfmgmtpolicysets", "perfmgmtpolicysetstacks"])
+
     # Memory maps for the ID Handshake
     fresh_id_map = {}
     perfmgmtpolicyset_id_name = {}
@@ -2984,27 +3318,42 @@ def push_policy_performance(cgx_session, loaded_config):
     ############################################################################
     # 1. Performance Set - Create & Update
     ############################################################################
-    perfsetconfig_yaml = extractfromyaml(loaded_config=loaded_config, config_type="perfmgmtpolicysets")
+    perfsetconfig_yaml = config_index["perfmgmtpolicysets"]
     if not perfsetconfig_yaml:
-        print("INFO: No Performance Sets found in YAML.")
+        logger.info("INFO: No Performance Sets found in YAML.")
         perfsetconfig_yaml = {}
 
-    for perfsetname in perfsetconfig_yaml.keys():
-        set_yaml = perfsetconfig_yaml[perfsetname]
+    # Prefetch the rules of every set that already exists on the controller, concurrently
+    def get_perf_rules(set_id):
+        rules_ctrl = {}
+        r_resp = cgx_session.get.perfmgmtpolicysets_perfmgmtpolicyrules(perfmgmtpolicyset_id=set_id)
+        if r_resp.cgx_status:
+            for rule in r_resp.cgx_content.get("items", []):
+                rules_ctrl[rule["name"]] = rule
+        else:
+            logger.error("ERR: Could not retrieve rules for Performance Set ID: {}".format(set_id))
+
+        return rules_ctrl
+
+    existing_set_ids = [perfmgmtpolicyset_name_config[perfsetname]["id"] for perfsetname in perfsetconfig_yaml
+                        if perfsetname in perfmgmtpolicyset_name_config]
+    rules_ctrl_by_setid = dict(zip(existing_set_ids, run_concurrent(get_perf_rules, existing_set_ids)))
+
+    for perfsetname, set_yaml in perfsetconfig_yaml.items():
         
         # YAML formatting: Extract the list of rule dicts
         rules_yaml_list = set_yaml.get("perfmgmtpolicyrules", [])
-        if "perfmgmtpolicyrules" in set_yaml:
-            del set_yaml["perfmgmtpolicyrules"]
+        # Build the set payload as a shallow copy, leaving the loaded YAML untouched
+        set_payload = {k: v for k, v in set_yaml.items() if k != "perfmgmtpolicyrules"}
             
         # Extract rule order
         rule_order = set_yaml.get("link_health_policyrule_order", None)
-        set_yaml["link_health_policyrule_order"] = None
+        set_payload["link_health_policyrule_order"] = None
 
         # GOLDEN RULE #1: The Clone Wiper
-        set_yaml["clone_from"] = None
+        set_payload["clone_from"] = None
 
-        if perfsetname in perfmgmtpolicyset_name_config.keys():
+        if perfsetname in perfmgmtpolicyset_name_config:
             # --- EXISTING SET ---
             set_ctrl = perfmgmtpolicyset_name_config[perfsetname]
             set_id = set_ctrl["id"]
@@ -3013,18 +3362,18 @@ def push_policy_performance(cgx_session, loaded_config):
             perfmgmtpolicyset_id_name[set_id] = perfsetname
             perfmgmtpolicyset_name_id[perfsetname] = set_id
 
-            if len(compareconf(set_yaml, set_ctrl)) > 0:
-                data = update_payload(set_yaml, set_ctrl)
+            if len(compareconf(set_payload, set_ctrl)) > 0:
+                data = update_payload(set_payload, set_ctrl)
                 if data.get("defaultrule_policyset") is True and "link_health_policyrule_order" in data:
                     del data["link_health_policyrule_order"]
                 resp = cgx_session.put.perfmgmtpolicysets(perfmgmtpolicyset_id=set_id, data=data)
-                if resp.cgx_status: print("Updated Performance Set: {}".format(perfsetname))
+                if resp.cgx_status: logger.info("Updated Performance Set: {}".format(perfsetname))
 
         else:
             # --- NEW SET ---
-            resp = cgx_session.post.perfmgmtpolicysets(data=set_yaml)
+            resp = cgx_session.post.perfmgmtpolicysets(data=set_payload)
             if resp.cgx_status:
-                print("Created Performance Set: {}".format(perfsetname))
+                logger.info("Created Performance Set: {}".format(perfsetname))
                 set_id = resp.cgx_content.get("id")
                 
                 # MEMORY UPDATE
@@ -3032,26 +3381,25 @@ def push_policy_performance(cgx_session, loaded_config):
                 perfmgmtpolicyset_id_name[set_id] = perfsetname
                 perfmgmtpolicyset_name_id[perfsetname] = set_id
             else:
-                print("ERR: Could not create Perf Set {}: {}".format(perfsetname, resp.cgx_content))
+                logger.error("ERR: Could not create Perf Set {}: {}".format(perfsetname, resp.cgx_content))
                 continue
 
         ############################################################################
         # Performance Rules
         ############################################################################
         # GOLDEN RULE #2: Catch Auto-Created Rules (Like "Default Performance Policy Rule for All Apps")
-        rules_ctrl = {}
-        r_resp = cgx_session.get.perfmgmtpolicysets_perfmgmtpolicyrules(perfmgmtpolicyset_id=set_id)
-        if r_resp.cgx_status:
-            for rule in r_resp.cgx_content.get("items", []):
-                rules_ctrl[rule["name"]] = rule
+        if set_id in rules_ctrl_by_setid:
+            rules_ctrl = rules_ctrl_by_setid[set_id]
+        else:
+            rules_ctrl = get_perf_rules(set_id)
 
         perf_rule_name_id = {}
-        rule_names_in_yaml = []
+        rule_names_in_yaml = set()
 
-        for r_entry in rules_yaml_list:
-            rulename = list(r_entry.keys())[0]
+        def push_perf_rule(r_entry):
+            rulename = next(iter(r_entry))
             rule_data = r_entry[rulename]
-            rule_names_in_yaml.append(rulename)
+            rule_names_in_yaml.add(rulename)
 
             # Map Threshold Profile Names -> IDs
             tp_name = rule_data.get("thresholdprofile_id")
@@ -3061,8 +3409,8 @@ def push_policy_performance(cgx_session, loaded_config):
             # Use master translator for apps, etc.
             try:
                 rule_data = translate_rule(rule=rule_data, action=N2ID, rule_type=PERFORMANCE)
-            except:
-                pass 
+            except (KeyError, TypeError, AttributeError) as e:
+                logger.debug("translate_rule fallback for {}: {}".format(rulename, e))
 
             if rulename in rules_ctrl:
                 # RULE EXISTS: PUT
@@ -3071,41 +3419,52 @@ def push_policy_performance(cgx_session, loaded_config):
                     r_payload = update_payload(rule_data, r_ctrl)
                     resp_rule = cgx_session.put.perfmgmtpolicysets_perfmgmtpolicyrules(perfmgmtpolicyset_id=set_id, perfmgmtpolicyrule_id=r_payload["id"], data=r_payload)
                     if resp_rule.cgx_status:
-                        print("\tUpdated Rule: {}".format(rulename))
+                        logger.info("\tUpdated Rule: {}".format(rulename))
                         perf_rule_name_id[rulename] = r_payload["id"]
                     else:
-                        print("\tERR: Failed to update Rule {}: {}".format(rulename, resp_rule.cgx_content))
+                        logger.error("\tERR: Failed to update Rule {}: {}".format(rulename, resp_rule.cgx_content))
                 else:
                     perf_rule_name_id[rulename] = r_ctrl["id"]
             else:
                 # RULE MISSING: POST
                 resp_rule = cgx_session.post.perfmgmtpolicysets_perfmgmtpolicyrules(perfmgmtpolicyset_id=set_id, data=rule_data)
                 if resp_rule.cgx_status:
-                    print("\tCreated Rule: {}".format(rulename))
+                    logger.info("\tCreated Rule: {}".format(rulename))
                     perf_rule_name_id[rulename] = resp_rule.cgx_content.get("id")
                 else:
-                    print("\tERR: Failed to create Rule {}: {}".format(rulename, resp_rule.cgx_content))
+                    logger.error("\tERR: Failed to create Rule {}: {}".format(rulename, resp_rule.cgx_content))
+
+        # Concurrent POSTs land in any order; only safe when the order PUT below rewrites it
+        finalize_order = rule_order and set_yaml.get("defaultrule_policyset") is not True
+        if finalize_order:
+            run_concurrent(push_perf_rule, rules_yaml_list)
+        else:
+            for r_entry in rules_yaml_list:
+                push_perf_rule(r_entry)
 
         # Finalize Rule Order
-        if rule_order and set_yaml.get("defaultrule_policyset") is not True:
+        if finalize_order:
             valid_rule_ids = [perf_rule_name_id[rname] for rname in rule_order if rname in perf_rule_name_id]
             cgx_session.put.perfmgmtpolicysets(perfmgmtpolicyset_id=set_id, data={"id": set_id, "link_health_policyrule_order": valid_rule_ids})
 
         # Cleanup Orphaned Rules
-        for rulename, rule_data in rules_ctrl.items():
-            if rulename not in rule_names_in_yaml:
-                cgx_session.delete.perfmgmtpolicysets_perfmgmtpolicyrules(perfmgmtpolicyset_id=set_id, perfmgmtpolicyrule_id=rule_data["id"])
-                print("\tDeleted Orphaned Rule: {}".format(rulename))
+        delete_orphans(lambda rule_data: cgx_session.delete.perfmgmtpolicysets_perfmgmtpolicyrules(perfmgmtpolicyset_id=set_id, perfmgmtpolicyrule_id=rule_data["id"]),
+                       orphans=[(rulename, rule_data) for rulename, rule_data in rules_ctrl.items()
+                                if rulename not in rule_names_in_yaml],
+                       message="\tDeleted Orphaned Rule: {}")
 
     ############################################################################
     # 2. Performance Stack - ID Swap & Create
     ############################################################################
-    perfstackconfig_yaml = extractfromyaml(loaded_config=loaded_config, config_type="perfmgmtpolicysetstacks")
+    perfstackconfig_yaml = config_index["perfmgmtpolicysetstacks"]
     if not perfstackconfig_yaml:
         perfstackconfig_yaml = {}
-        
-    for perfstackname in perfstackconfig_yaml.keys():
-        stack_yaml = perfstackconfig_yaml[perfstackname]
+
+    # Policy set name or old ID -> fresh ID, built once for the ID swap below
+    policyset_fresh_id = dict(fresh_id_map)
+    policyset_fresh_id.update({set_id: fresh_id_map.get(set_name, set_id) for set_id, set_name in perfmgmtpolicyset_id_name.items()})
+
+    for perfstackname, stack_yaml in perfstackconfig_yaml.items():
 
         # GOLDEN RULE #3: The Shared Default Set ID Swap
         global_default_name = "Default Performance Policy Set (Simple)"
@@ -3114,47 +3473,44 @@ def push_policy_performance(cgx_session, loaded_config):
 
         # Swap Custom Policy Set Lists
         if stack_yaml.get("policyset_ids"):
-            new_ps_list = []
-            for item in stack_yaml["policyset_ids"]:
-                item_name = perfmgmtpolicyset_id_name.get(str(item), item)
-                new_ps_list.append(fresh_id_map.get(item_name, item))
-            stack_yaml["policyset_ids"] = new_ps_list
+            stack_yaml["policyset_ids"] = [policyset_fresh_id.get(item, item) for item in stack_yaml["policyset_ids"]]
 
         try:
             stack_data_yaml = translate_stack(stack=stack_yaml, action=N2ID, stack_type=PERFORMANCE)
             stack_data_yaml = update_stack(stack_data_yaml)
-        except:
+        except (KeyError, TypeError, AttributeError) as e:
+            logger.debug("translate_stack fallback for {}: {}".format(perfstackname, e))
             stack_data_yaml = stack_yaml
 
-        if perfstackname in perfmgmtpolicystack_name_config.keys():
+        if perfstackname in perfmgmtpolicystack_name_config:
             stack_ctrl = perfmgmtpolicystack_name_config[perfstackname]
             if len(compareconf(stack_data_yaml, stack_ctrl)) > 0:
                 data = update_payload(stack_data_yaml, stack_ctrl)
                 resp = cgx_session.put.perfmgmtpolicysetstacks(perfmgmtpolicysetstack_id=data["id"], data=data)
-                if resp.cgx_status: print("Updated Performance Stack: {}".format(perfstackname))
+                if resp.cgx_status: logger.info("Updated Performance Stack: {}".format(perfstackname))
             else:
-                print("No Changes to Performance Stack: {}".format(perfstackname))
+                logger.info("No Changes to Performance Stack: {}".format(perfstackname))
         else:
             resp = cgx_session.post.perfmgmtpolicysetstacks(data=stack_data_yaml)
-            if resp.cgx_status: print("Created Performance Stack: {}".format(perfstackname))
-            else: print("ERR: Could not create Perf Stack {}: {}".format(perfstackname, resp.cgx_content))
+            if resp.cgx_status: logger.info("Created Performance Stack: {}".format(perfstackname))
+            else: logger.error("ERR: Could not create Perf Stack {}: {}".format(perfstackname, resp.cgx_content))
 
     ############################################################################
     # 3. Cleanup - Safety Shields
     ############################################################################
     # GOLDEN RULE #4: Protect the Defaults
-    for name, ctrl_data in perfmgmtpolicystack_name_config.items():
-        if ctrl_data.get("default_policysetstack") is True: continue
-        if name not in perfstackconfig_yaml:
-            cgx_session.delete.perfmgmtpolicysetstacks(perfmgmtpolicysetstack_id=ctrl_data["id"])
-            print("Deleted Orphaned Performance Stack: {}".format(name))
-
-    for name, ctrl_data in perfmgmtpolicyset_name_config.items():
-        if ctrl_data.get("defaultrule_policyset") is True: continue
-        if name not in perfsetconfig_yaml:
-            cgx_session.delete.perfmgmtpolicysets(perfmgmtpolicyset_id=ctrl_data["id"])
-            print("Deleted Orphaned Performance Set: {}".format(name))
-
+    # Stacks go first, since they reference the sets
+    orphan_names = perfmgmtpolicystack_name_config.keys() - protected_names(perfmgmtpolicystack_name_config, "default_policysetstack") - perfstackconfig_yaml.keys()
+    delete_orphans(lambda ctrl_data: cgx_session.delete.perfmgmtpolicysetstacks(perfmgmtpolicysetstack_id=ctrl_data["id"]),
+                   orphans=[(name, perfmgmtpolicystack_name_config[name]) for name in orphan_names],
+                   message="Deleted Orphaned Performance Stack: {}")
+
+    orphan_names = perfmgmtpolicyset_name_config.keys() - protected_names(perfmgmtpolicyset_name_config, "defaultrule_policyset") - perfsetconfig_yaml.keys()
+    delete_orphans(lambda ctrl_data: cgx_session.delete.perfmgmtpolicysets(perfmgmtpolicyset_id=ctrl_data["id"]),
+                   orphans=[(name, perfmgmtpolicyset_name_config[name]) for name in orphan_names],
+                   message="Deleted Orphaned Performance Set: {}")
+
+    log_buffer.flush()
     return
 
 
@@ -3182,6 +3538,8 @@ def go():
                               default=None)
     policy_group.add_argument("--filename","-F", help="File name. Provide the entire path", type=str,
                              default=None)
+    policy_group.add_argument("--snapshot", "-S", help="Reuse the controller snapshot saved on disk when the policy objects are unchanged (not used for performance)",
+                              action="store_true", default=False)
 
     args = vars(parser.parse_args())
 
@@ -3190,6 +3548,7 @@ def go():
     ############################################################################
     policytype = args['policytype']
     filename = args["filename"]
+    use_snapshot = args["snapshot"]
 
     if policytype is None:
         print("ERR: Please provide policytype")
@@ -3207,7 +3566,7 @@ def go():
     ############################################################################
     print("INFO: Extracting data from {}".format(filename))
     with open(filename, 'r') as datafile:
-        loaded_config = yaml.safe_load(datafile)
+        loaded_config = yaml.load(datafile, Loader=SafeLoader)
 
     ############################################################################
     # Push Config
@@ -3218,41 +3577,50 @@ def go():
 
     if policytype == PATH:
         print("INFO: Building PATH Translation Dicts")
-        create_global_dicts_path(cgx_session=cgx_session)
+        snapshot_key = create_global_dicts_cached(cgx_session=cgx_session, policytype=PATH,
+                                                 create_func=create_global_dicts_path, use_snapshot=use_snapshot)
         print("INFO: Reviewing YAML Configuration for updates")
         push_policy_path(cgx_session=cgx_session, loaded_config=loaded_config)
 
     elif policytype == QOS:
         print("INFO: Building QOS Translation Dicts")
-        create_global_dicts_qos(cgx_session=cgx_session)
+        snapshot_key = create_global_dicts_cached(cgx_session=cgx_session, policytype=QOS,
+                                                 create_func=create_global_dicts_qos, use_snapshot=use_snapshot)
         print("INFO: Reviewing YAML Configuration for updates")
         push_policy_qos(cgx_session=cgx_session, loaded_config=loaded_config)
 
     elif policytype == NAT:
         print("INFO: Building NAT Translation Dicts")
-        create_global_dicts_nat(cgx_session=cgx_session)
+        snapshot_key = create_global_dicts_cached(cgx_session=cgx_session, policytype=NAT,
+                                                 create_func=create_global_dicts_nat, use_snapshot=use_snapshot)
         print("INFO: Reviewing YAML Configuration for updates")
         push_policy_nat(cgx_session=cgx_session, loaded_config=loaded_config)
 
     elif policytype == SECURITY:
         print("INFO: Building SEC Translation Dicts")
-        create_global_dicts_security(cgx_session=cgx_session)
+        snapshot_key = create_global_dicts_cached(cgx_session=cgx_session, policytype=SECURITY,
+                                                 create_func=create_global_dicts_security, use_snapshot=use_snapshot)
         print("INFO: Reviewing YAML Configuration for updates")
         push_policy_security(cgx_session=cgx_session, loaded_config=loaded_config)
     elif policytype == PERFORMANCE:
         print("INFO: Building PERF Translation Dicts")
-        create_global_dicts_performance(cgx_session=cgx_session)
+        snapshot_key = create_global_dicts_cached(cgx_session=cgx_session, policytype=PERFORMANCE,
+                                                 create_func=create_global_dicts_performance, use_snapshot=use_snapshot)
         print("INFO: Reviewing YAML Configuration for updates")
         push_policy_performance(cgx_session=cgx_session, loaded_config=loaded_config)
     elif policytype == ALL:
         print("INFO: Building Translation Dicts")
-        create_global_dicts_all(cgx_session=cgx_session)
+        snapshot_key = create_global_dicts_cached(cgx_session=cgx_session, policytype=ALL,
+                                                 create_func=create_global_dicts_all, use_snapshot=use_snapshot)
         push_policy_path(cgx_session=cgx_session, loaded_config=loaded_config)
         push_policy_qos(cgx_session=cgx_session, loaded_config=loaded_config)
         push_policy_nat(cgx_session=cgx_session, loaded_config=loaded_config)
         push_policy_security(cgx_session=cgx_session, loaded_config=loaded_config)
         push_policy_performance(cgx_session=cgx_session, loaded_config=loaded_config) # <-- Added this!
 
+    if use_snapshot:
+        finish_snapshot(cgx_session=cgx_session, policytype=policytype, snapshot_key=snapshot_key)
+
 
 if __name__ == "__main__":
     go()
@@ -7,6 +7,12 @@ import os
 import yaml
 from prisma_sase import API
 
+# Prefer the libyaml-backed loader when available
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 # Authenticate
 sdk = API()
 sdk.interactive.login_secret(
@@ -17,7 +23,7 @@ sdk.interactive.login_secret(
 
 # Load YAML
 with open("pulled_resources.yaml", "r") as f:
-    resources = yaml.safe_load(f)
+    resources = yaml.load(f, Loader=SafeLoader)
 
 # Push sites
 for site in resources.get("sites", []):
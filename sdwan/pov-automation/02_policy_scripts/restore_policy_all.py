@@ -14,6 +14,14 @@ import copy
 import argparse
 import datetime
 from dictdiffer import diff
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Prefer the libyaml-backed loader when available
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
 try:
     from prisma_sase import API
@@ -36,6 +44,18 @@ sdk.interactive.login_secret(
     client_secret=PRISMASASE_CLIENT_SECRET,
     tsg_id=PRISMASASE_TSG_ID
 )
+
+# Keep-alive connection pool on the SDK's HTTP session, reused across the sequential restore calls
+sdk_http_session = sdk.expose_session() if hasattr(sdk, "expose_session") else getattr(sdk, "_session", None)
+if sdk_http_session is not None:
+    # Only enlarge the pool; keep the SDK's retry policy (429/5xx, Retry-After) when it set one
+    sdk_retry = sdk_http_session.get_adapter("https://").max_retries
+    if not sdk_retry.status_forcelist:
+        # allowed_methods=None: like the SDK, also retry POST/PUT/DELETE on rate limits and gateway errors
+        sdk_retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504], allowed_methods=None,
+                          respect_retry_after_header=True, raise_on_status=False)
+    sdk_http_session.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=sdk_retry))
+
 cgx_session = sdk
 
 # --- Global Constants ---
@@ -43,6 +63,7 @@ PATH, QOS, NAT, SECURITY, PERFORMANCE, ALL = "path", "qos", "nat", "security", "
 N2ID, ID2N = "n2id", "id2n"
 DELETE_KEYS = ["_created_on_utc", "_debug", "_error", "_etag", "_info", "_schema", 
                "_updated_on_utc", "_warning", "_request_id", "_content_length", "_status_code", "id"]
+DELETE_KEYS_SET = frozenset(DELETE_KEYS)
 
 # --- Global Translation Dictionaries ---
 app_id_name, app_name_id = {}, {}
@@ -65,9 +86,11 @@ perf_threshold_name_id = {}
 # --- Helper Functions ---
 def cleandata(data):
     if not isinstance(data, dict): return data
-    return {k: v for k, v in data.items() if k not in DELETE_KEYS}
+    if DELETE_KEYS_SET.isdisjoint(data): return data  # nothing to strip
+    return {k: v for k, v in data.items() if k not in DELETE_KEYS_SET}
 
 def compareconf(origconf, curconf):
+    if origconf == curconf: return []
     result = list(diff(origconf, curconf))
     resources_updated = []
     for item in result:
@@ -77,7 +100,7 @@ def compareconf(origconf, curconf):
     return resources_updated
 
 def update_payload(source, dest):
-    for key in source.keys(): dest[key] = source[key]
+    dest.update(source)
     return dest
 
 def create_global_dicts_all(cgx):
@@ -100,13 +123,24 @@ def create_global_dicts_all(cgx):
     print("[+] Dictionaries ready.")
 
 # --- THE PERFORMANCE LOGIC ---
+# Translation dicts are bound as defaults so the per-rule lookups are locals, not globals
+def translate_perf_rule_ids(r_data, app_name_id=app_name_id, perf_threshold_name_id=perf_threshold_name_id):
+    tp = r_data.get("thresholdprofile_id")
+    if tp in perf_threshold_name_id: r_data["thresholdprofile_id"] = perf_threshold_name_id[tp]
+    af = r_data.get("app_filters")
+    app_ids = af.get("application_ids") if isinstance(af, dict) else None
+    if app_ids: af["application_ids"] = [app_name_id.get(n, n) for n in app_ids]
+    return r_data
+
 def push_policy_performance(cgx, loaded_config, dryrun=False):
     print("[*] Processing Performance Policies...")
     existing = {i["name"]: i["id"] for i in cgx.get.perfmgmtpolicysets().cgx_content.get("items", [])}
     perf_sets = loaded_config.get("performance_sets", [])
+    # Accept both a name -> config mapping and the older list of single-key maps
+    if isinstance(perf_sets, dict): perf_sets = [{name: conf} for name, conf in perf_sets.items()]
     
     for set_entry in perf_sets:
-        set_name = list(set_entry.keys())[0]
+        set_name = next(iter(set_entry))
         set_data = set_entry[set_name]
         rules_list = set_data.pop("rules", [])
         
@@ -123,15 +157,10 @@ def push_policy_performance(cgx, loaded_config, dryrun=False):
                 set_id = resp.cgx_content.get("id")
 
         for rule_wrapper in rules_list:
-            r_name = list(rule_wrapper.keys())[0]
+            r_name = next(iter(rule_wrapper))
             r_data = rule_wrapper[r_name]
-            # Translate
-            tp = r_data.get("thresholdprofile_id")
-            if tp in perf_threshold_name_id: r_data["thresholdprofile_id"] = perf_threshold_name_id[tp]
-            af = r_data.get("app_filters")
-            if isinstance(af, dict) and af.get("application_ids"):
-                r_data["app_filters"]["application_ids"] = [app_name_id.get(n, n) for n in af["application_ids"]]
-            
+            translate_perf_rule_ids(r_data)
+
             if dryrun: print(f"        [DRY RUN] Would PUSH Rule: {r_name}")
             else: cgx.post.perfmgmtpolicysets_perfmgmtpolicyrules(perfmgmtpolicyset_id=set_id, data=cleandata(r_data))
 
@@ -151,7 +180,7 @@ def go():
     args = parser.parse_args()
 
     with open(args.filename, 'r') as f:
-        loaded_config = yaml.safe_load(f)
+        loaded_config = yaml.load(f, Loader=SafeLoader)
 
     create_global_dicts_all(sdk)
 
@@ -5,17 +5,28 @@ import os
 import argparse
 import datetime
 import prisma_sase
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Prefer the LibYAML-backed dumper when available
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
 
 # ---------- Constants ----------
 SCRIPT_NAME = "Policy Tool: Master Pull"
 __version__ = "1.3.0"
 
-DELETE_KEYS = ["_created_on_utc", "_debug", "_error", "_etag",
-               "_info", "_schema", "_updated_on_utc", "_warning",
-               "_request_id", "_content_length", "_status_code", "id"]
+DELETE_KEYS = frozenset({"_created_on_utc", "_debug", "_error", "_etag",
+                         "_info", "_schema", "_updated_on_utc", "_warning",
+                         "_request_id", "_content_length", "_status_code", "id"})
 
 PATH, QOS, NAT, SECURITY, PERFORMANCE, ALL = "path", "qos", "nat", "security", "performance", "all"
 
+MAX_WORKERS = 8
+
 # Global Mapping Dicts
 app_id_name = {}
 perf_threshold_id_name = {}
@@ -31,22 +42,40 @@ def cleandata(data):
     if not isinstance(data, dict): return data
     return {k: v for k, v in data.items() if k not in DELETE_KEYS}
 
+# Build the node directly: None never needs alias tracking or style resolution.
+# A shared node instance would make the serializer emit &anchors/*aliases.
 def represent_none(self, _):
-    return self.represent_scalar('tag:yaml.org,2002:null', '')
+    return yaml.ScalarNode('tag:yaml.org,2002:null', '')
+
+class PolicyDumper(SafeDumper):
+    """Block style, API key order, 2-space indent and 120-column lines at every nesting level."""
+    def __init__(self, stream, **kwargs):
+        kwargs.update(default_flow_style=False, sort_keys=False)
+        kwargs["indent"] = kwargs.get("indent") or 2
+        kwargs["width"] = kwargs.get("width") or 120
+        super().__init__(stream, **kwargs)
 
-yaml.add_representer(type(None), represent_none, Dumper=yaml.SafeDumper)
+PolicyDumper.add_representer(type(None), represent_none)
 
 def create_global_dicts_all(sdk):
     print("[*] Building translation dictionaries...")
-    apps = sdk.get.appdefs().cgx_content.get("items", [])
-    for item in apps: app_id_name[item["id"]] = item["display_name"]
-    
-    for item in sdk.get.networkpolicysets().cgx_content.get("items", []): nw_set_id_name[item["id"]] = item["name"]
-    for item in sdk.get.prioritypolicysets().cgx_content.get("items", []): qos_set_id_name[item["id"]] = item["name"]
-    for item in sdk.get.natpolicysets().cgx_content.get("items", []): nat_set_id_name[item["id"]] = item["name"]
-    for item in sdk.get.ngfwsecuritypolicysets().cgx_content.get("items", []): sec_set_id_name[item["id"]] = item["name"]
-    for item in sdk.get.perfmgmtpolicysets().cgx_content.get("items", []): perf_set_id_name[item["id"]] = item["name"]
-    for item in sdk.get.perfmgmtthresholdprofiles().cgx_content.get("items", []): perf_threshold_id_name[item["id"]] = item["name"]
+    lookups = [
+        (sdk.get.appdefs, app_id_name, "display_name"),
+        (sdk.get.networkpolicysets, nw_set_id_name, "name"),
+        (sdk.get.prioritypolicysets, qos_set_id_name, "name"),
+        (sdk.get.natpolicysets, nat_set_id_name, "name"),
+        (sdk.get.ngfwsecuritypolicysets, sec_set_id_name, "name"),
+        (sdk.get.perfmgmtpolicysets, perf_set_id_name, "name"),
+        (sdk.get.perfmgmtthresholdprofiles, perf_threshold_id_name, "name"),
+    ]
+
+    # Independent GETs: fetch in parallel, fill the dicts back on the main thread
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {executor.submit(get_func): (id_name, key) for get_func, id_name, key in lookups}
+        for future in as_completed(futures):
+            id_name, key = futures[future]
+            for item in future.result().cgx_content.get("items", []):
+                id_name[item["id"]] = item[key]
 
 def translate_rule(rule, rule_type):
     if rule_type == PERFORMANCE:
@@ -56,26 +85,35 @@ def translate_rule(rule, rule_type):
     
     apps = rule.get("app_def_ids")
     if apps:
-        rule["app_def_ids"] = [app_id_name.get(aid, aid) for aid in apps]
+        app_id_name_get = app_id_name.get
+        rule["app_def_ids"] = [app_id_name_get(aid, aid) for aid in apps]
     return rule
 
 def pull_generic_policy(sdk, section_key, stack_func, set_func, rule_func, set_map, rule_type):
     print(f"[*] Pulling {section_key.replace('_', ' ').title()}...")
+    # Sections are emitted as name -> config mappings (insertion order is preserved)
     stack_data, set_data = {}, {}
-    
-    stacks = stack_func().cgx_content.get("items", [])
+    CONFIG[f"{section_key}_stacks"] = stack_data
+    CONFIG[f"{section_key}_sets"] = set_data
+
+    stacks = (stack_func().cgx_content or {}).get("items") or []
+    sets = (set_func().cgx_content or {}).get("items") or []
+    if not stacks and not sets:
+        return
+
+    set_map_get = set_map.get
     for s in stacks:
         clean = cleandata(s)
-        if clean.get("policyset_ids"):
-            clean["policyset_ids"] = [set_map.get(sid, sid) for sid in clean["policyset_ids"]]
+        policyset_ids = clean.get("policyset_ids")
+        if policyset_ids:
+            clean["policyset_ids"] = [set_map_get(sid, sid) for sid in policyset_ids]
         stack_data[s["name"]] = clean
 
-    sets = set_func().cgx_content.get("items", [])
-    for pset in sets:
-        rule_config = {}
-        # Fetching rules
-        res = rule_func(pset["id"])
-        
+    # Fetch the rules of every set in parallel
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        rule_responses = list(executor.map(lambda pset: rule_func(pset["id"]), sets))
+
+    for pset, res in zip(sets, rule_responses):
         # Determine if we handle a standard SDK response or a raw requests response
         items = []
         if hasattr(res, 'cgx_content'):
@@ -83,16 +121,10 @@ def pull_generic_policy(sdk, section_key, stack_func, set_func, rule_func, set_m
         elif isinstance(res, dict):
             items = res.get("items", [])
 
-        for r in items:
-            rule_config[r["name"]] = translate_rule(cleandata(r), rule_type)
-        
         clean_set = cleandata(pset)
-        clean_set["rules"] = [{rn: rule_config[rn]} for rn in rule_config.keys()]
+        clean_set["rules"] = [{r["name"]: translate_rule(cleandata(r), rule_type)} for r in items]
         set_data[pset["name"]] = clean_set
 
-    CONFIG[f"{section_key}_stacks"] = [{n: stack_data[n]} for n in stack_data.keys()]
-    CONFIG[f"{section_key}_sets"] = [{n: set_data[n]} for n in set_data.keys()]
-
 def main():
     parser = argparse.ArgumentParser(description=SCRIPT_NAME)
     parser.add_argument("-PT", "--policytype", default="all", choices=[PATH, QOS, NAT, SECURITY, PERFORMANCE, ALL])
@@ -107,6 +139,17 @@ def main():
     )
     sdk.get.profile().raise_for_status()
 
+    # Keep-alive connection pool on the SDK's HTTP session, sized for the concurrent pulls
+    sdk_http_session = sdk.expose_session() if hasattr(sdk, "expose_session") else getattr(sdk, "_session", None)
+    if sdk_http_session is not None:
+        # Only enlarge the pool; keep the SDK's retry policy (429/5xx, Retry-After) when it set one
+        sdk_retry = sdk_http_session.get_adapter("https://").max_retries
+        if not sdk_retry.status_forcelist:
+            # allowed_methods=None: like the SDK, also retry POST/PUT/DELETE on rate limits and gateway errors
+            sdk_retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504], allowed_methods=None,
+                              respect_retry_after_header=True, raise_on_status=False)
+        sdk_http_session.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=sdk_retry))
+
     filename = args.output or f"./prisma_sdwan_{args.policytype}_policies.yml"
     create_global_dicts_all(sdk)
 
@@ -128,15 +171,27 @@ def main():
     }
 
     if args.policytype == ALL:
-        for p_type in [PATH, QOS, NAT, SECURITY, PERFORMANCE]:
+        p_types = [PATH, QOS, NAT, SECURITY, PERFORMANCE]
+        # Reserve the sections in export order; the pulls below finish in any order
+        for p_type in p_types:
+            CONFIG[f"{pt_map[p_type][0]}_stacks"] = {}
+            CONFIG[f"{pt_map[p_type][0]}_sets"] = {}
+
+        def pull(p_type):
             params = pt_map[p_type]
             pull_generic_policy(sdk, params[0], params[1], params[2], params[3], params[4], p_type)
+
+        # Policy types are independent: pull them concurrently
+        with ThreadPoolExecutor(max_workers=len(p_types)) as executor:
+            list(executor.map(pull, p_types))
     else:
         params = pt_map[args.policytype]
         pull_generic_policy(sdk, params[0], params[1], params[2], params[3], params[4], args.policytype)
 
+    # Emit one top-level section at a time; the concatenated block mappings form a single document
     with open(filename, "w") as f:
-        yaml.safe_dump(CONFIG, f, default_flow_style=False)
+        for section, section_config in CONFIG.items():
+            yaml.dump({section: section_config}, f, Dumper=PolicyDumper)
     
     print(f"\n[SUCCESS] Master Policy Export Complete: {filename}")
 
@@ -1,11 +1,13 @@
-import requests
 import json
 import argparse
 import keyring
 import sys
 import os
+import time
 import dns.resolver
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Any
+from api_common import make_session, json_loads, json_dumps
 
 # ---------- Constants ----------
 SERVICE_NAME = "prismasase"
@@ -16,6 +18,12 @@ BASE_URL = "https://api.sase.paloaltonetworks.com"
 TARGET_LIST_NAME = "API-GENERATED"  # Change this to MIST-IP or any other name
 DOMAIN_FILE = "domains.txt"
 DNS_SERVERS = ["8.8.8.8", "208.67.222.222"]
+MAX_DNS_WORKERS = 32
+PREFIX_ID_CACHE_FILE = os.path.expanduser("~/.cache/prismasase/global_prefixes.json")
+PREFIX_ID_CACHE_TTL = 24 * 3600  # seconds
+
+# Shared keep-alive session with retries on transient errors
+SESSION = make_session(pool_connections=16, pool_maxsize=16)
 
 def get_token():
     try:
@@ -28,15 +36,15 @@ def get_token():
             "scope": f"tsg_id:{tsg_id}", 
             "grant_type": "client_credentials"
         }
-        r = requests.post(AUTH_URL, data=data)
+        r = SESSION.post(AUTH_URL, data=data)
         r.raise_for_status()
-        return r.json()["access_token"]
+        return json_loads(r.content)["access_token"]
     except Exception as e:
         print(f"Auth Error: {e}")
         sys.exit(1)
 
 def get_profile(headers: Dict[str, str]):
-    requests.get(f"{BASE_URL}/sdwan/v2.1/api/profile", headers=headers).raise_for_status()
+    SESSION.get(f"{BASE_URL}/sdwan/v2.1/api/profile", headers=headers).raise_for_status()
     print("[*] Profile Initialized")
 
 def resolve_domains_to_prefixes():
@@ -49,29 +57,74 @@ def resolve_domains_to_prefixes():
     resolver.nameservers = DNS_SERVERS
     
     with open(DOMAIN_FILE, 'r') as f:
-        domains = [line.strip() for line in f if line.strip()]
+        # Strip each line once and drop repeated domains (file order kept)
+        domains = list(dict.fromkeys(name for name in (line.strip() for line in f) if name))
 
-    print(f"[*] Resolving {len(domains)} domains using DNS {DNS_SERVERS}...")
-    for domain in domains:
+    def resolve_one(domain):
         try:
-            answers = resolver.resolve(domain, 'A')
-            for data in answers:
-                resolved_set.add(f"{data.to_text()}/32")
-            print(f"  [+] {domain} resolved.")
+            return [data.to_text() for data in resolver.resolve(domain, 'A')], None
         except Exception as e:
-            print(f"  [!] {domain} failed: {e}")
+            return [], e
+
+    print(f"[*] Resolving {len(domains)} domains using DNS {DNS_SERVERS}...")
+    with ThreadPoolExecutor(max_workers=MAX_DNS_WORKERS) as executor:
+        futures = {executor.submit(resolve_one, domain): domain for domain in domains}
+        for future in as_completed(futures):
+            domain = futures[future]
+            addresses, error = future.result()
+            if error is not None:
+                print(f"  [!] {domain} failed: {error}")
+                continue
+            resolved_set.update(addresses)
+            print(f"  [+] {domain} resolved.")
 
-    return list(resolved_set)
+    return [f"{address}/32" for address in resolved_set]
+
+def load_prefix_id_cache():
+    """Returns the cached {name: id} map, or {} when missing or older than the TTL."""
+    try:
+        if time.time() - os.path.getmtime(PREFIX_ID_CACHE_FILE) > PREFIX_ID_CACHE_TTL:
+            return {}
+        with open(PREFIX_ID_CACHE_FILE, 'rb') as f:
+            return json_loads(f.read())
+    except (OSError, ValueError):
+        return {}
+
+def save_prefix_id_cache(cache):
+    try:
+        os.makedirs(os.path.dirname(PREFIX_ID_CACHE_FILE), exist_ok=True)
+        with open(PREFIX_ID_CACHE_FILE, 'w') as f:
+            json.dump(cache, f)
+    except OSError as e:
+        print(f"  [!] Could not write prefix id cache: {e}")
 
 def get_prefix_list_by_name(headers, name):
     """Searches for the prefix list by name and returns the full object."""
     url = f"{BASE_URL}/sdwan/v2.1/api/networkpolicyglobalprefixes"
-    r = requests.get(url, headers=headers)
+
+    # 1. Cached id: fetch just that object
+    cache = load_prefix_id_cache()
+    list_id = cache.get(name)
+    if list_id:
+        r = SESSION.get(f"{url}/{list_id}", headers=headers)
+        if r.status_code == 200:
+            item = json_loads(r.content)
+            if item.get("name") == name:
+                return item
+
+    # 2. Ask the API to filter by name, then fall back to the full list
+    r = SESSION.get(url, headers=headers, params={"name": name})
     r.raise_for_status()
-    
-    items = r.json().get("items", [])
+    items = json_loads(r.content).get("items", [])
+    if not items:
+        r = SESSION.get(url, headers=headers)
+        r.raise_for_status()
+        items = json_loads(r.content).get("items", [])
+
     for item in items:
         if item.get("name") == name:
+            cache[name] = item.get("id")
+            save_prefix_id_cache(cache)
             return item
     
     print(f"ERROR: Prefix list named '{name}' not found.")
@@ -82,15 +135,17 @@ def update_global_prefix_list(headers, new_prefixes):
     print(f"[*] Searching for global prefix list: {TARGET_LIST_NAME}...")
     current_obj = get_prefix_list_by_name(headers, TARGET_LIST_NAME)
     
-    list_id = current_obj.get("id")
-    current_prefixes = set(current_obj.get("ipv4_prefixes") or [])
-    
     # 2. Check if update is needed
-    if set(new_prefixes) == current_prefixes:
+    new_set = frozenset(new_prefixes)
+    current_set = frozenset(current_obj.get("ipv4_prefixes") or ())
+    if new_set == current_set:
         print(f"[+] '{TARGET_LIST_NAME}' is already in sync. No update needed.")
         return
+    print(f"    -> {len(new_set - current_set)} prefixes to add, {len(current_set - new_set)} to remove")
 
-    # 3. Build PUT Payload
+    # 3. Build PUT Payload (sorted so the stored list is stable across runs)
+    list_id = current_obj.get("id")
+    new_prefixes = sorted(new_prefixes)
     url = f"{BASE_URL}/sdwan/v2.1/api/networkpolicyglobalprefixes/{list_id}"
     payload = {
         "id": list_id,
@@ -104,10 +159,10 @@ def update_global_prefix_list(headers, new_prefixes):
     }
 
     print(f"[*] Updating '{TARGET_LIST_NAME}' ({list_id}) with {len(new_prefixes)} IPs...")
-    put_r = requests.put(url, headers=headers, json=payload)
+    put_r = SESSION.put(url, headers=headers, data=json_dumps(payload))
     
     if put_r.status_code == 200:
-        print(f"[SUCCESS] Updated. New ETAG: {put_r.json().get('_etag')}")
+        print(f"[SUCCESS] Updated. New ETAG: {json_loads(put_r.content).get('_etag')}")
     else:
         print(f"[!] Update failed: {put_r.status_code} - {put_r.text}")
 
@@ -0,0 +1,76 @@
+import os
+import sys
+import json
+import time
+import keyring
+from typing import Dict, List
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ---------- Constants ----------
+BASE_API_URL = "https://api.sase.paloaltonetworks.com"
+SERVICE_NAME = "prismasase"
+CACHE_DIR = os.path.expanduser("~/.cache/prismasase")
+CACHE_TTL = 300  # seconds; long enough to cover several reports run back-to-back
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) seconds
+
+SITES_URL = f"{BASE_API_URL}/sdwan/v4.11/api/sites"
+ELEMENTS_URL = f"{BASE_API_URL}/sdwan/v3.2/api/elements"
+
+# ---------- Helpers ----------
+def _cache_file(kind: str) -> str:
+    # One file per tenant so switching TSGs never serves another tenant's inventory
+    tsg_id = keyring.get_password(SERVICE_NAME, "tsg_id") or "default"
+    return os.path.join(CACHE_DIR, f"{kind}_{tsg_id}.json")
+
+def _load(path: str):
+    try:
+        if time.time() - os.path.getmtime(path) > CACHE_TTL:
+            return None
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read()) if orjson is not None else json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+def _save(path: str, items: List[Dict]):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(items) if orjson is not None else json.dumps(items).encode())
+    except OSError as e:
+        print(f"[!] Could not write inventory cache: {e}")
+
+def _fetch(session, headers: Dict[str, str], kind: str, url: str) -> List[Dict]:
+    res = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    if not (200 <= res.status_code < 300):
+        print(f"CRITICAL ERROR fetching {kind}: Status {res.status_code}")
+        print(f"Raw Response: {res.text[:500]}...")
+        sys.exit(1)
+    body = orjson.loads(res.content) if orjson is not None else res.json()
+    return body.get('items', [])
+
+def _get_items(session, headers: Dict[str, str], kind: str, url: str, refresh: bool = False) -> List[Dict]:
+    path = _cache_file(kind)
+    items = None if refresh else _load(path)
+    if items is not None:
+        return items
+
+    items = _fetch(session, headers, kind, url)
+    _save(path, items)
+    return items
+
+def get_sites(session, headers: Dict[str, str], refresh: bool = False) -> List[Dict]:
+    """Returns all sites, served from the local cache when it is younger than CACHE_TTL."""
+    return _get_items(session, headers, "sites", SITES_URL, refresh)
+
+def get_elements(session, headers: Dict[str, str], refresh: bool = False) -> List[Dict]:
+    """Returns all elements, served from the local cache when it is younger than CACHE_TTL."""
+    return _get_items(session, headers, "elements", ELEMENTS_URL, refresh)
+
+def fetch_site_elements(session, headers: Dict[str, str], site_id: str) -> List[Dict]:
+    """Returns the elements of one site, always live: scripts that act on a single element
+    must not resolve a name to a shell that was deleted and recreated within CACHE_TTL."""
+    return _fetch(session, headers, f"elements of site {site_id}", f"{ELEMENTS_URL}?site_id={site_id}")
@@ -0,0 +1,96 @@
+import json
+import sys
+import time
+import hashlib
+import functools
+import keyring
+from keyring.errors import KeyringError
+
+# ---------- Constants ----------
+AUTH_URL = "https://auth.apps.paloaltonetworks.com/oauth2/access_token"
+PROFILE_URL = "https://api.sase.paloaltonetworks.com/sdwan/v2.1/api/profile"
+SERVICE_NAME = "prismasase"
+TOKEN_CACHE_KEY = "token_cache"
+TOKEN_REFRESH_MARGIN = 60  # seconds before expiry at which a cached token is renewed
+
+# ---------- Helpers ----------
+# Keychain values do not change during a run; read each one only once
+@functools.lru_cache(maxsize=None)
+def _get_credential(key: str) -> str:
+    val = keyring.get_password(SERVICE_NAME, key)
+    if not val:
+        print(f"CRITICAL ERROR: Credential '{key}' not found in Keychain.")
+        sys.exit(1)
+    return val
+
+def _client_hash(client_id: str) -> str:
+    # Ties the cached token to the client credentials without storing the id itself
+    return hashlib.sha256(client_id.encode()).hexdigest()[:16]
+
+def _load_cached_token(tsg_id: str, client_id: str):
+    """Returns the cached bearer token for this TSG and client if it is still valid, else None."""
+    try:
+        cached = json.loads(keyring.get_password(SERVICE_NAME, TOKEN_CACHE_KEY) or "{}")
+    except (KeyringError, ValueError):
+        return None
+    if cached.get("tsg_id") != tsg_id or cached.get("client_hash") != _client_hash(client_id):
+        return None
+    if time.time() >= cached.get("exp_epoch", 0) - TOKEN_REFRESH_MARGIN:
+        return None
+    return cached.get("access_token")
+
+def _save_cached_token(tsg_id: str, client_id: str, access_token: str, expires_in: int):
+    cached = {"tsg_id": tsg_id, "client_hash": _client_hash(client_id),
+              "access_token": access_token, "exp_epoch": time.time() + expires_in}
+    try:
+        keyring.set_password(SERVICE_NAME, TOKEN_CACHE_KEY, json.dumps(cached))
+    except KeyringError as e:
+        print(f"[!] Could not cache token in Keychain: {e}")
+
+def get_token(session) -> str:
+    """Returns a bearer token, reusing the Keychain-cached one until shortly before it expires."""
+    tsg_id = _get_credential("tsg_id")
+    client_id = _get_credential("client_id")
+    token = _load_cached_token(tsg_id, client_id)
+    if token:
+        return token
+
+    data = {
+        "client_id": client_id,
+        "client_secret": _get_credential("client_secret"),
+        "scope": f"tsg_id:{tsg_id}",
+        "grant_type": "client_credentials",
+    }
+    try:
+        r = session.post(AUTH_URL, data=data, timeout=30)
+        r.raise_for_status()
+        body = r.json()
+    except Exception as e:
+        print(f"CRITICAL ERROR getting token: {e}")
+        sys.exit(1)
+
+    token = body["access_token"]
+    if body.get("expires_in"):
+        _save_cached_token(tsg_id, client_id, token, int(body["expires_in"]))
+    return token
+
+def invalidate():
+    """Drops the cached token; call it on a 401 so the next get_token() logs in again."""
+    try:
+        keyring.delete_password(SERVICE_NAME, TOKEN_CACHE_KEY)
+    except KeyringError:
+        pass
+
+def init_profile(session, headers: dict, timeout=30) -> str:
+    """Initializes the session profile and returns the bearer token in use.
+
+    A 401 means the cached token was revoked or the credentials rotated before it
+    expired: drop it, log in again and retry once, updating headers in place.
+    """
+    res = session.get(PROFILE_URL, headers=headers, timeout=timeout)
+    if res.status_code == 401:
+        invalidate()
+        headers["Authorization"] = f"Bearer {get_token(session)}"
+        res = session.get(PROFILE_URL, headers=headers, timeout=timeout)
+    res.raise_for_status()
+    return headers["Authorization"].split(" ", 1)[1]
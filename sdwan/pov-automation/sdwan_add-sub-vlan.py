@@ -1,17 +1,23 @@
 import os
-import json
 import argparse
-import requests
 import keyring
 import sys
-from typing import Dict, Any, List, Optional
+import functools
+from typing import Dict, Any, Optional
+from api_common import make_session, json_loads, json_dumps, build_name_index
 
 # ---------- Constants ----------
 AUTH_URL = "https://auth.apps.paloaltonetworks.com/oauth2/access_token"
 BASE_API_URL = "https://api.sase.paloaltonetworks.com"
 SERVICE_NAME = "prismasase"
+NAME_FIELDS = ('name', 'display_name', 'model_name')  # interfaces can be matched by model name too
+
+# Shared keep-alive session with retries on transient errors
+SESSION = make_session(pool_connections=16, pool_maxsize=16)
 
 # ---------- Helpers ----------
+# Keychain values do not change during a run; read each one only once
+@functools.lru_cache(maxsize=None)
 def _get_credential(key: str) -> str:
     val = keyring.get_password(SERVICE_NAME, key)
     if not val:
@@ -32,30 +38,27 @@ def get_token() -> str:
     }
     
     try:
-        r = requests.post(AUTH_URL, data=data, timeout=30)
+        r = SESSION.post(AUTH_URL, data=data, timeout=30)
         r.raise_for_status()
-        return r.json()["access_token"]
+        return json_loads(r.content)["access_token"]
     except Exception as e:
         print(f"Auth Failed: {e}")
         sys.exit(1)
 
 def get_profile(headers: Dict[str, str]):
     try:
-        requests.get(f"{BASE_API_URL}/sdwan/v2.1/api/profile", headers=headers).raise_for_status()
+        SESSION.get(f"{BASE_API_URL}/sdwan/v2.1/api/profile", headers=headers).raise_for_status()
         print("[*] Profile Initialized")
     except Exception as e:
         print(f"Profile Init Failed: {e}")
         sys.exit(1)
 
-def find_item(items: List[Dict], name: str, label: str) -> Dict:
+def find_item(index: Dict[str, Dict], name: str, label: str) -> Dict:
     """Finds the full object by name (case-insensitive)."""
-    target = name.strip().lower()
-    for item in items:
-        # Check name, display_name, model_name
-        if (item.get('name') or '').lower() == target: return item
-        if (item.get('display_name') or '').lower() == target: return item
-        if (item.get('model_name') or '').lower() == target: return item
-    
+    item = index.get(name.strip().lower())
+    if item is not None:
+        return item
+
     print(f"[!] Error: Could not find {label} named '{name}'")
     sys.exit(1)
 
@@ -82,26 +85,26 @@ def main():
 
     # 2. Get Site ID
     print(f"[*] Locating Site '{args.site}'...")
-    sites_resp = requests.get(f"{BASE_API_URL}/sdwan/v4.11/api/sites", headers=headers)
+    sites_resp = SESSION.get(f"{BASE_API_URL}/sdwan/v4.11/api/sites", headers=headers)
     sites_resp.raise_for_status()
-    site_obj = find_item(sites_resp.json().get('items', []), args.site, "Site")
+    site_obj = find_item(build_name_index(json_loads(sites_resp.content).get('items', []), NAME_FIELDS), args.site, "Site")
     site_id = site_obj['id']
 
     # 3. Get Device ID
     print(f"[*] Locating Device '{args.device}'...")
-    elems_resp = requests.get(f"{BASE_API_URL}/sdwan/v3.2/api/elements?site_id={site_id}", headers=headers)
+    elems_resp = SESSION.get(f"{BASE_API_URL}/sdwan/v3.2/api/elements?site_id={site_id}", headers=headers)
     elems_resp.raise_for_status()
-    dev_obj = find_item(elems_resp.json().get('items', []), args.device, "Device")
+    dev_obj = find_item(build_name_index(json_loads(elems_resp.content).get('items', []), NAME_FIELDS), args.device, "Device")
     element_id = dev_obj['id']
 
     # 4. Get Parent Interface & Extract Info
     print(f"[*] Fetching interfaces for '{args.device}'...")
     intf_url = f"{BASE_API_URL}/sdwan/v4.21/api/sites/{site_id}/elements/{element_id}/interfaces"
-    intf_resp = requests.get(intf_url, headers=headers)
+    intf_resp = SESSION.get(intf_url, headers=headers)
     intf_resp.raise_for_status()
     
     # Find the specific parent object
-    parent_obj = find_item(intf_resp.json().get('items', []), args.interface, "Interface")
+    parent_obj = find_item(build_name_index(json_loads(intf_resp.content).get('items', []), NAME_FIELDS), args.interface, "Interface")
     
     parent_id = parent_obj['id']
     vrf_id = parent_obj.get('vrf_context_id')
@@ -188,10 +191,10 @@ def main():
     print(f"[*] Pushing new sub-interface (VLAN {args.vlan}) to {args.device}...")
     
     try:
-        post_resp = requests.post(intf_url, headers=headers, json=payload)
+        post_resp = SESSION.post(intf_url, headers=headers, data=json_dumps(payload))
         
         if post_resp.status_code in [200, 201]:
-            new_item = post_resp.json()
+            new_item = json_loads(post_resp.content)
             print(f"\n[SUCCESS] Created Sub-interface!")
             print(f"          ID: {new_item.get('id')}")
             print(f"          Name: {new_item.get('name')}")
@@ -1,11 +1,11 @@
 # ---------- time parsing ----------
 from datetime import datetime, timedelta, timezone
-import requests
 import os
 import json
+import functools
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Any, Optional, Iterable, Tuple
-import requests
+from api_common import make_session, json_loads, json_dumps
 
 ###
 
@@ -13,6 +13,11 @@ import requests
 AUTH_URL = "https://auth.apps.paloaltonetworks.com/oauth2/access_token"
 BASE_API_URL = "https://api.sase.paloaltonetworks.com"
 
+# Shared keep-alive session with retries on transient errors
+SESSION = make_session(pool_connections=16, pool_maxsize=16)
+
+# Environment values do not change during a run; read each one only once
+@functools.lru_cache(maxsize=None)
 def _must_env(name: str) -> str:
     v = os.getenv(name)
     if not v:
@@ -27,15 +32,17 @@ def get_token() -> str:
         "grant_type": "client_credentials",
     }
     
-    r = requests.post(
+    r = SESSION.post(
         AUTH_URL,
         headers={"Content-Type": "application/x-www-form-urlencoded"},
         data=data,
         timeout=30,
     )
     r.raise_for_status()
-    return r.json()["access_token"]
+    return json_loads(r.content)["access_token"]
 
+# Built once per token and shared by every api_get/api_post call; treat as read-only
+@functools.lru_cache(maxsize=4)
 def get_headers(token: str) -> Dict[str, str]:
     return {
         "accept": "application/json",
@@ -50,23 +57,23 @@ def get_profile(token: str) -> Dict[str, Any]:
 # ---------- tiny HTTP ----------
 def api_get(ep: str, token: str, params: Optional[Dict[str, Any]] = None) -> Any:
     url = ep if ep.startswith("http") else f"{BASE_API_URL}{ep}"
-    r = requests.get(url, headers=get_headers(token), params=params, timeout=60)
+    r = SESSION.get(url, headers=get_headers(token), params=params, timeout=60)
     r.raise_for_status()
     if not r.text.strip():
         return None
     try:
-        return r.json()
+        return json_loads(r.content)
     except json.JSONDecodeError:
         return r.text
 
 def api_post(ep: str, token: str, payload: Dict[str, Any]) -> Any:
     url = ep if ep.startswith("http") else f"{BASE_API_URL}{ep}"
-    r = requests.post(url, headers=get_headers(token), json=payload, timeout=60)
+    r = SESSION.post(url, headers=get_headers(token), data=json_dumps(payload), timeout=60)
     r.raise_for_status()
     if not r.text.strip():
         return None
     try:
-        return r.json()
+        return json_loads(r.content)
     except json.JSONDecodeError:
         return r.text
     def get_headers(token):
@@ -87,11 +94,11 @@ if __name__ == "__main__":
     # API endpoint for DECLAIM 
     url = "https://api.sase.paloaltonetworks.com/sdwan/v2.0/api/elements/1770818494593010045/operations"
     payload = {"action":"declaim","parameters":[]}
-    response = requests.post(url, headers=headers,params=None,json=payload)
+    response = SESSION.post(url, headers=headers,params=None,data=json_dumps(payload))
 
     # Check for success
     if response.status_code == 200:
-        print(json.dumps(response.json(), indent=2))
+        print(json.dumps(json_loads(response.content), indent=2))
     else:
         print(f"Failed to declaim ION . Status code: {response.status_code}")
   
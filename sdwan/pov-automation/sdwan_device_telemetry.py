@@ -1,64 +1,61 @@
 import os
-import requests
-import json
 import csv
 import argparse
-import sys
-import keyring
+import prisma_auth
+import inventory_cache
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+from api_common import make_session, json_loads, json_dumps
 
 # ---------- Constants ----------
 AUTH_URL = "https://auth.apps.paloaltonetworks.com/oauth2/access_token"
 BASE_API_URL = "https://api.sase.paloaltonetworks.com"
 SERVICE_NAME = "prismasase"
-
-def _get_credential(key: str) -> str:
-    val = keyring.get_password(SERVICE_NAME, key)
-    if not val:
-        print(f"CRITICAL ERROR: Credential '{key}' not found in Keychain.")
-        sys.exit(1)
-    return val
+MAX_WORKERS = 20  # concurrent metric requests
+METRICS_BATCH_SIZE = 25  # elements per sys_metrics query
+CSV_FLUSH_EVERY = 100  # rows
+
+REPORT_FIELDS = ("Site", "Device", "CPU Avg (%)", "CPU Max (%)", "Mem Avg (%)", "Mem Max (%)",
+                 "Disk Max (%)", "CPU Temp Max (C)")
+
+SYS_METRICS_URL = f"{BASE_API_URL}/sdwan/monitor/v2.3/api/monitor/sys_metrics"
+
+# Static part of every sys_metrics query (window from your successful curl); only the filter varies
+SYS_METRICS_QUERY = {
+    "start_time": "2026-02-22T09:52:00.000Z",
+    "end_time": "2026-02-23T09:47:00.000Z",
+    "interval": "5min",
+    "metrics": [
+        {"name": "CPUUsage", "statistics": ["max", "average"], "unit": "percentage"},
+        {"name": "MemoryUsage", "statistics": ["max", "average"], "unit": "percentage"},
+        {"name": "DiskUsage", "statistics": ["max"], "unit": "percentage"},
+        {"name": "DeviceCpuTemperature", "statistics": ["max"], "unit": "celsius"}
+    ],
+    "view": {"individual": "element", "summary": True}
+}
+
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) seconds
+
+# Shared keep-alive session with retries on transient errors
+SESSION = make_session(pool_connections=32, pool_maxsize=64, retry_posts=True)  # POSTs here are read-only queries
 
 def get_token() -> str:
-    data = {
-        "client_id": _get_credential("client_id"),
-        "client_secret": _get_credential("client_secret"),
-        "scope": f"tsg_id:{_get_credential('tsg_id')}",
-        "grant_type": "client_credentials",
-    }
-    r = requests.post(AUTH_URL, data=data, timeout=30)
-    r.raise_for_status()
-    return r.json()["access_token"]
+    # Reuses the Keychain-cached token across runs until it is about to expire
+    return prisma_auth.get_token(SESSION)
 
 def get_profile(headers: Dict[str, str]):
-    requests.get(f"{BASE_API_URL}/sdwan/v2.1/api/profile", headers=headers).raise_for_status()
+    prisma_auth.init_profile(SESSION, headers, REQUEST_TIMEOUT)
     print("[*] Profile Initialized")
 
-def get_sys_metrics(headers: Dict[str, str], site_id: str, element_id: str, debug=False):
-    url = f"{BASE_API_URL}/sdwan/monitor/v2.3/api/monitor/sys_metrics"
-    
-    # Using the window from your successful curl
-    payload = {
-        "start_time": "2026-02-22T09:52:00.000Z",
-        "end_time": "2026-02-23T09:47:00.000Z",
-        "filter": {
-            "site": [site_id],
-            "element": [element_id]
-        },
-        "interval": "5min",
-        "metrics": [
-            {"name": "CPUUsage", "statistics": ["max", "average"], "unit": "percentage"},
-            {"name": "MemoryUsage", "statistics": ["max", "average"], "unit": "percentage"},
-            {"name": "DiskUsage", "statistics": ["max"], "unit": "percentage"},
-            {"name": "DeviceCpuTemperature", "statistics": ["max"], "unit": "celsius"}
-        ],
-        "view": {"summary": True} 
-    }
+def get_sys_metrics(headers: Dict[str, str], site_ids: List[str], element_ids: List[str], debug=False) -> Dict[str, List[Dict]]:
+    """Queries metrics for a batch of elements; returns {element_id: metrics[]}."""
+    # Shallow copy: the shared query pieces are never mutated, so threads can reuse them
+    payload = dict(SYS_METRICS_QUERY, filter={"site": site_ids, "element": element_ids})
 
-    print(f"\n--- REQUESTING METRICS FOR ELEMENT: {element_id} ---")
+    print(f"\n--- REQUESTING METRICS FOR {len(element_ids)} ELEMENT(S) ---")
     try:
-        res = requests.post(url, headers=headers, json=payload)
+        res = SESSION.post(SYS_METRICS_URL, headers=headers, data=json_dumps(payload), timeout=REQUEST_TIMEOUT)
         
         # --- THIS PRINTS THE RAW API RESPONSE ---
         print(f"STATUS CODE: {res.status_code}")
@@ -67,46 +64,55 @@ def get_sys_metrics(headers: Dict[str, str], site_id: str, element_id: str, debu
         print("---------------------------------------------------\n")
         
         if res.status_code == 200:
-            return res.json().get('metrics', [])
+            return split_metrics_by_element(json_loads(res.content).get('metrics', []), element_ids)
             
     except Exception as e:
         print(f"    [!] Metric Request Exception: {e}")
-    return []
+    return {}
 
-def parse_summary_v2(metrics_list: List[Dict], metric_name: str, stat_type: str):
+def split_metrics_by_element(metrics_list: List[Dict], element_ids: List[str]) -> Dict[str, List[Dict]]:
+    """Regroups a batched response into per-element metrics[] using each series' element id."""
+    per_element = {eid: [] for eid in element_ids}
+    for m in metrics_list:
+        for s in m.get('series', []):
+            eid = str(s.get('element_id') or s.get('device_id') or "")
+            if eid not in per_element:
+                # Unlabelled series can only be attributed when the batch has a single element
+                if len(element_ids) != 1:
+                    continue
+                eid = element_ids[0]
+            per_element[eid].append({"name": m.get('name'), "series": [s]})
+    return per_element
+
+def index_metrics(metrics_list: List[Dict]) -> Dict[Tuple[Optional[str], str], float]:
     """
-    Robust parser for: metrics[] -> series[] -> data[] -> datapoints[]
-    Handles cases where 'name' might be missing or nested differently.
+    Single pass over: metrics[] -> series[] -> data[] -> datapoints[]
+    Maps (metric_name, statistic) to the summary value, else the latest non-null datapoint.
+    The first series that provides a value wins; unlabelled metrics are keyed under None.
     """
-    if not metrics_list:
-        return "N/A"
-
-    for m in metrics_list:
-        # Check if the name matches OR if there's only one metric and we're desperate
-        api_metric_name = m.get('name')
-        
-        # If we requested one metric and the API didn't label it, we proceed anyway
-        if api_metric_name == metric_name or api_metric_name is None:
-            series = m.get('series', [])
-            for s in series:
-                # 1. Try Summary Object (Most efficient)
-                summary = s.get('summary', {})
-                if summary and stat_type in summary:
-                    return round(summary[stat_type], 2)
-                
-                # 2. Dig into Data -> Datapoints
-                data_list = s.get('data', [])
-                for d in data_list:
-                    # Match the statistic (max/average)
-                    if d.get('statistics') == stat_type:
-                        dps = d.get('datapoints', [])
-                        # Extract non-null values
-                        valid_vals = [dp['value'] for dp in dps if dp.get('value') is not None]
-                        if valid_vals:
-                            # Return the latest one
-                            return round(valid_vals[-1], 2)
-                            
-    return "N/A"
+    idx = {}
+    for m in metrics_list or []:
+        name = m.get('name')
+        for s in m.get('series', []):
+            # 1. Summary object (most efficient)
+            for stat_type, value in (s.get('summary') or {}).items():
+                if value is not None:
+                    idx.setdefault((name, stat_type), round(value, 2))
+
+            # 2. Data -> Datapoints: keep the latest non-null value per statistic
+            for d in s.get('data', []):
+                key = (name, d.get('statistics'))
+                if key in idx:
+                    continue
+                for dp in reversed(d.get('datapoints', [])):
+                    if dp.get('value') is not None:
+                        idx[key] = round(dp['value'], 2)
+                        break
+    return idx
+
+def metric_value(idx: Dict[Tuple[Optional[str], str], float], metric_name: str, stat_type: str):
+    # If the API didn't label a metric, fall back to the unlabelled entry
+    return idx.get((metric_name, stat_type), idx.get((None, stat_type), "N/A"))
 
 def main():
     parser = argparse.ArgumentParser()
@@ -124,64 +130,73 @@ def main():
     get_profile(headers)
 
     print("[*] Fetching Sites and Elements...")
-    sites_res = requests.get(f"{BASE_API_URL}/sdwan/v4.11/api/sites", headers=headers)
-    sites = sites_res.json().get('items', [])
+    sites = inventory_cache.get_sites(SESSION, headers)
     
     # Use string keys for ID map to prevent matching issues
     site_map = {str(s['id']): s['name'] for s in sites}
-    site_tags_map = {str(s['id']): (s.get('tags') or []) for s in sites}
-
-    elements_res = requests.get(f"{BASE_API_URL}/sdwan/v3.2/api/elements", headers=headers)
-    elements = elements_res.json().get('items', [])
+    site_tags_map = {str(s['id']): frozenset(s.get('tags') or ()) for s in sites}
 
-    target_tags = [t.strip() for t in args.tags.split(',')] if args.tags else []
-    csv_data = []
+    elements = inventory_cache.get_elements(SESSION, headers)
 
-    has_debugged = False
-
-    print(f"[*] Processing telemetry for {len(elements)} elements...")
+    target_tags = frozenset(t.strip() for t in args.tags.split(',')) if args.tags else frozenset()
 
+    # Filter logic
+    selected = []
     for dev in elements:
         sid = str(dev.get('site_id'))
-        eid = str(dev.get('id'))
-        
-        # Filter logic
-        site_tags = site_tags_map.get(sid, [])
-        if target_tags and not any(tag in site_tags for tag in target_tags):
+        if target_tags and target_tags.isdisjoint(site_tags_map.get(sid, ())):
             continue
+        selected.append(dev)
 
-        print(f"  [>] Collecting: {dev['name']} ({site_map.get(sid, 'Unassigned')})")
-        
-        # Call API
-        do_debug = args.debug and not has_debugged
-        metrics_raw = get_sys_metrics(headers, sid, eid, debug=do_debug)
-        if do_debug: has_debugged = True
-
-        # Build Row
-        row = {
-            "Site": site_map.get(sid, "Unassigned"),
-            "Device": dev['name'],
-            "CPU Avg (%)": parse_summary_v2(metrics_raw, "CPUUsage", "average"),
-            "CPU Max (%)": parse_summary_v2(metrics_raw, "CPUUsage", "max"),
-            "Mem Avg (%)": parse_summary_v2(metrics_raw, "MemoryUsage", "average"),
-            "Mem Max (%)": parse_summary_v2(metrics_raw, "MemoryUsage", "max"),
-            "Disk Max (%)": parse_summary_v2(metrics_raw, "DiskUsage", "max"),
-            "CPU Temp Max (C)": parse_summary_v2(metrics_raw, "DeviceCpuTemperature", "max")
-        }
-        csv_data.append(row)
-        # ADD THIS LINE TO PRINT TO TERMINAL:
-        #print(f"    -> CPU: {row['CPU Max (%)']}% | Mem: {row['Mem Max (%)']}% | Temp: {row['CPU Temp Max (C)']}C")
-    # Export
-    if csv_data:
-        filename = "sdwan_pov_telemetry_report.csv"
-        keys = csv_data[0].keys()
-        with open(filename, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=keys)
-            writer.writeheader()
-            writer.writerows(csv_data)
-        print(f"\n[SUCCESS] POV Report generated: {filename}")
-    else:
+    if not selected:
         print("\n[!] No devices matching those criteria were found.")
+        return
+
+    print(f"[*] Processing telemetry for {len(selected)} of {len(elements)} elements...")
+
+    def collect(indexed_batch):
+        index, batch = indexed_batch
+        for dev in batch:
+            print(f"  [>] Collecting: {dev['name']} ({site_map.get(str(dev.get('site_id')), 'Unassigned')})")
+        site_ids = list(dict.fromkeys(str(dev.get('site_id')) for dev in batch))
+        element_ids = [str(dev.get('id')) for dev in batch]
+        batch_metrics = get_sys_metrics(headers, site_ids, element_ids, debug=args.debug and index == 0)
+        # Index in the worker so parsing overlaps with the other batches' network waits
+        return {eid: index_metrics(metrics) for eid, metrics in batch_metrics.items()}
+
+    # One query per batch of devices; batches are independent, so fan them out
+    batches = [selected[i:i + METRICS_BATCH_SIZE] for i in range(0, len(selected), METRICS_BATCH_SIZE)]
+    idx_by_element = {}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for batch_idx in executor.map(collect, enumerate(batches)):
+            idx_by_element.update(batch_idx)
+
+    # Export: rows are streamed to the CSV as they are built
+    filename = "sdwan_pov_telemetry_report.csv"
+    with open(filename, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_FIELDS)
+        for n, dev in enumerate(selected, 1):
+            sid = str(dev.get('site_id'))
+
+            # Build Row (tuple in REPORT_FIELDS order)
+            idx = idx_by_element.get(str(dev.get('id')), {})
+            row = (
+                site_map.get(sid, "Unassigned"),
+                dev['name'],
+                metric_value(idx, "CPUUsage", "average"),
+                metric_value(idx, "CPUUsage", "max"),
+                metric_value(idx, "MemoryUsage", "average"),
+                metric_value(idx, "MemoryUsage", "max"),
+                metric_value(idx, "DiskUsage", "max"),
+                metric_value(idx, "DeviceCpuTemperature", "max"),
+            )
+            writer.writerow(row)
+            if n % CSV_FLUSH_EVERY == 0:
+                f.flush()
+            # ADD THIS LINE TO PRINT TO TERMINAL:
+            #print(f"    -> CPU: {row[3]}% | Mem: {row[5]}% | Temp: {row[7]}C")
+    print(f"\n[SUCCESS] POV Report generated: {filename}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
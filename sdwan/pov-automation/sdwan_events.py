@@ -1,38 +1,31 @@
 import os
-import requests
-import json
 import csv
 import argparse
-import sys
-import keyring
+import prisma_auth
+import inventory_cache
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Any
+from api_common import make_session, json_loads, json_dumps
 
 # ---------- Constants ----------
 AUTH_URL = "https://auth.apps.paloaltonetworks.com/oauth2/access_token"
 BASE_API_URL = "https://api.sase.paloaltonetworks.com"
 SERVICE_NAME = "prismasase"
+CSV_FLUSH_EVERY = 100  # rows
 
-def _get_credential(key: str) -> str:
-    val = keyring.get_password(SERVICE_NAME, key)
-    if not val:
-        print(f"CRITICAL ERROR: Credential '{key}' not found in Keychain.")
-        sys.exit(1)
-    return val
+REPORT_FIELDS = ("Time", "Type", "Severity", "Site", "Device", "Description", "Status", "Correlation ID")
+
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) seconds
+
+# Shared keep-alive session with retries on transient errors
+SESSION = make_session(pool_connections=32, pool_maxsize=64, retry_posts=True)  # POSTs here are read-only queries
 
 def get_token() -> str:
-    data = {
-        "client_id": _get_credential("client_id"),
-        "client_secret": _get_credential("client_secret"),
-        "scope": f"tsg_id:{_get_credential('tsg_id')}",
-        "grant_type": "client_credentials"
-    }
-    r = requests.post(AUTH_URL, data=data, timeout=30)
-    r.raise_for_status()
-    return r.json()["access_token"]
+    # Reuses the Keychain-cached token across runs until it is about to expire
+    return prisma_auth.get_token(SESSION)
 
 def get_profile(headers: Dict[str, str]):
-    requests.get(f"{BASE_API_URL}/sdwan/v2.1/api/profile", headers=headers).raise_for_status()
+    prisma_auth.init_profile(SESSION, headers, REQUEST_TIMEOUT)
     print("[*] Profile Initialized")
 
 def fetch_events_final(headers: Dict[str, str], event_type: str) -> List[Dict]:
@@ -66,9 +59,9 @@ def fetch_events_final(headers: Dict[str, str], event_type: str) -> List[Dict]:
     }
 
     try:
-        res = requests.post(url, headers=headers, json=payload)
+        res = SESSION.post(url, headers=headers, data=json_dumps(payload), timeout=REQUEST_TIMEOUT)
         if res.status_code == 200:
-            return res.json().get('items', [])
+            return json_loads(res.content).get('items', [])
         else:
             print(f"\n[!] API Error {res.status_code} for {event_type}")
             print(f"    Response: {res.text}")
@@ -76,19 +69,23 @@ def fetch_events_final(headers: Dict[str, str], event_type: str) -> List[Dict]:
         print(f"    [!] Request failed: {e}")
     return []
 
+def describe_event(code, info: Dict[str, Any]) -> str:
+    """Joins the non-empty description segments of an event."""
+    reason = info.get('reason')
+    process = info.get('process_name')
+    if not (reason or process):
+        return code or ""
+    details = [code] if code else []
+    if reason: details.append(f"Reason: {reason}")
+    if process: details.append(f"Process: {process}")
+    return " | ".join(details)
+
 def main():
     token = get_token()
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json", "x-panw-region": "de"}
     get_profile(headers)
 
-    # 1. Map Names
-    print("[*] Resolving Site and Device names...")
-    sites = requests.get(f"{BASE_API_URL}/sdwan/v4.11/api/sites", headers=headers).json().get('items', [])
-    site_map = {s['id']: s['name'] for s in sites}
-    elements = requests.get(f"{BASE_API_URL}/sdwan/v3.2/api/elements", headers=headers).json().get('items', [])
-    elem_map = {e['id']: e['name'] for e in elements}
-
-    # 2. Grab Data
+    # 1. Grab Data
     print("[*] Fetching Events (Last 24h)...")
     alarms = fetch_events_final(headers, "alarm")
     alerts = fetch_events_final(headers, "alert")
@@ -97,39 +94,49 @@ def main():
     all_raw = (alarms or []) + (alerts or []) + (incidents or [])
     print(f"    -> Found {len(all_raw)} total events.")
 
-    all_data = []
-    for item in all_raw:
-        sid = item.get('site_id')
-        eid = item.get('element_id')
-        info = item.get('info') or {}
-        
-        # Build description
-        details = []
-        if item.get('code'): details.append(item['code'])
-        if info.get('reason'): details.append(f"Reason: {info['reason']}")
-        if info.get('process_name'): details.append(f"Process: {info['process_name']}")
-        
-        all_data.append({
-            "Time": item.get('time'),
-            "Type": item.get('type', 'N/A').upper(),
-            "Severity": item.get('severity', 'N/A').upper(),
-            "Site": site_map.get(sid, sid),
-            "Device": elem_map.get(eid, "N/A"),
-            "Description": " | ".join(details),
-            "Status": "Standing" if item.get('standing') else "Cleared",
-            "Correlation ID": item.get('correlation_id', 'N/A') 
-        })
-    # 3. CSV Export
-    if all_data:
-        all_data.sort(key=lambda x: x['Time'], reverse=True)
-        filename = f"POV_Event_Log_{datetime.now().strftime('%H%M%S')}.csv"
-        with open(filename, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=all_data[0].keys())
-            writer.writeheader()
-            writer.writerows(all_data)
-        print(f"\n[SUCCESS] Report generated: {filename}")
-    else:
+    if not all_raw:
         print("\n[!] No events found. If you see data in the UI, check your TSG ID.")
+        return
+
+    # 2. Map Names: only the sites/devices the events actually reference
+    print("[*] Resolving Site and Device names...")
+    needed_sids = {e.get('site_id') for e in all_raw} - {None}
+    needed_eids = {e.get('element_id') for e in all_raw} - {None}
+    site_map = {}
+    if needed_sids:
+        site_map = {s['id']: s['name'] for s in inventory_cache.get_sites(SESSION, headers) if s['id'] in needed_sids}
+    elem_map = {}
+    if needed_eids:
+        elem_map = {e['id']: e['name'] for e in inventory_cache.get_elements(SESSION, headers) if e['id'] in needed_eids}
+
+    # 3. CSV Export: newest first, rows streamed to the file as they are built
+    all_raw.sort(key=lambda x: x.get('time') or "", reverse=True)
+    filename = f"POV_Event_Log_{datetime.now().strftime('%H%M%S')}.csv"
+    with open(filename, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_FIELDS)
+        # Hot loop: bind the lookups to locals once instead of resolving them per event
+        sget = site_map.get
+        eget = elem_map.get
+        writerow = writer.writerow
+        for n, item in enumerate(all_raw, 1):
+            iget = item.get
+            sid = iget('site_id')
+
+            # Tuple in REPORT_FIELDS order
+            writerow((
+                iget('time'),
+                iget('type', 'N/A').upper(),
+                iget('severity', 'N/A').upper(),
+                sget(sid, sid),
+                eget(iget('element_id'), "N/A"),
+                describe_event(iget('code'), iget('info') or {}),
+                "Standing" if iget('standing') else "Cleared",
+                iget('correlation_id', 'N/A'),
+            ))
+            if n % CSV_FLUSH_EVERY == 0:
+                f.flush()
+    print(f"\n[SUCCESS] Report generated: {filename}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
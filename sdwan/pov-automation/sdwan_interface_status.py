@@ -1,40 +1,39 @@
 import os
-import requests
 import json
 import csv
 import argparse
-import sys
-import keyring
+import prisma_auth
+import inventory_cache
 from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict
 from typing import Dict, Any, List
+from api_common import make_session
 
 # ---------- Constants ----------
 AUTH_URL = "https://auth.apps.paloaltonetworks.com/oauth2/access_token"
 BASE_API_URL = "https://api.sase.paloaltonetworks.com"
 SERVICE_NAME = "prismasase"
+MAX_WORKERS = 20  # concurrent per-interface requests
+CSV_FLUSH_EVERY = 100  # rows
+IDLE_USED_FOR = frozenset({None, "none", "unused"})  # interfaces that carry no traffic
 
-# ---------- Helpers ----------
+REPORT_FIELDS = ("Site", "Device", "Interface", "State", "MAC Address", "IPv4 Address",
+                 "Utilization (Avg 24h)", "Used For", "VRF")
+
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) seconds
 
-def _get_credential(key: str) -> str:
-    val = keyring.get_password(SERVICE_NAME, key)
-    if not val:
-        print(f"CRITICAL: Credential '{key}' not found in Keychain.")
-        sys.exit(1)
-    return val
+# Shared keep-alive session with retries on transient errors
+SESSION = make_session(pool_connections=32, pool_maxsize=64, retry_posts=True)  # POSTs here are read-only queries
+
+# ---------- Helpers ----------
 
 def get_token() -> str:
-    data = {
-        "client_id": _get_credential("client_id"),
-        "client_secret": _get_credential("client_secret"),
-        "scope": f"tsg_id:{_get_credential('tsg_id')}",
-        "grant_type": "client_credentials"
-    }
-    r = requests.post(AUTH_URL, data=data, timeout=30)
-    r.raise_for_status()
-    return r.json()["access_token"]
+    # Reuses the Keychain-cached token across runs until it is about to expire
+    return prisma_auth.get_token(SESSION)
 
 def get_profile(headers: Dict[str, str]):
-    requests.get(f"{BASE_API_URL}/sdwan/v2.1/api/profile", headers=headers).raise_for_status()
+    prisma_auth.init_profile(SESSION, headers, REQUEST_TIMEOUT)
     print("[*] Profile Initialized")
 
 def get_interface_bandwidth(headers: Dict[str, str], site_id: str, element_id: str, interface_id: str) -> str:
@@ -60,7 +59,7 @@ def get_interface_bandwidth(headers: Dict[str, str], site_id: str, element_id: s
     }
 
     try:
-        res = requests.post(url, headers=headers, json=payload)
+        res = SESSION.post(url, headers=headers, json=payload, timeout=REQUEST_TIMEOUT)
         if res.status_code == 200:
             metrics = res.json().get('metrics', [])
             for m in metrics:
@@ -71,16 +70,61 @@ def get_interface_bandwidth(headers: Dict[str, str], site_id: str, element_id: s
                     if summary and 'average' in summary:
                         return f"{round(summary['average'], 2)} Mbps"
                     
-                    # Fallback to last datapoint
+                    # Fallback to last datapoint: scan from the end, stop at the first value
                     for data_group in series.get('data', []):
-                        dps = data_group.get('datapoints', [])
-                        valid_vals = [dp['value'] for dp in dps if dp.get('value') is not None]
-                        if valid_vals:
-                            return f"{round(valid_vals[-1], 2)} Mbps"
+                        for dp in reversed(data_group.get('datapoints', [])):
+                            if dp.get('value') is not None:
+                                return f"{round(dp['value'], 2)} Mbps"
     except:
         pass
     return "0.00 Mbps"
 
+def audit_interface(headers: Dict[str, str], site_name: str, site_id: str, dev: Dict[str, Any], i: Dict[str, Any]):
+    """Returns the CSV row for one interface (status + utilization), or None on failure."""
+    element_id = dev['id']
+    intf_id = i['id']
+
+    # 4. Get Status (MAC/IP)
+    status_url = f"{BASE_API_URL}/sdwan/v3.9/api/sites/{site_id}/elements/{element_id}/interfaces/{intf_id}/status"
+    try:
+        s_res = SESSION.get(status_url, headers=headers, timeout=REQUEST_TIMEOUT)
+        if s_res.status_code == 200:
+            stat = s_res.json()
+            op_state = stat.get('operational_state', 'down')
+
+            # 5. Get Utilization ONLY if interface is UP
+            utilization = "0.00 Mbps"
+            if op_state == "up":
+                utilization = get_interface_bandwidth(headers, site_id, element_id, intf_id)
+
+            ip_val = stat.get('ipv4_addresses')
+            ip_str = ", ".join(ip_val) if isinstance(ip_val, list) else "N/A"
+
+            print(f"      - {i['name']}: {op_state} ({utilization})")
+            # Tuple in REPORT_FIELDS order
+            return (
+                site_name,
+                dev['name'],
+                i['name'],
+                op_state,
+                stat.get('mac_address', "N/A"),
+                ip_str,
+                utilization,
+                i.get('used_for'),
+                stat.get('vrf', {}).get('vrf_context_name', "Global"),
+            )
+    except Exception as e:
+        print(f"    [!] Error on {i['name']}: {e}")
+    return None
+
+def is_auditable(i: Dict[str, Any]) -> bool:
+    """Skips admin-down and unassigned interfaces before any status/metrics call is made."""
+    if i.get('used_for') in IDLE_USED_FOR:
+        return False
+    if i.get('admin_up') is False:
+        return False
+    return True
+
 # ---------- Main Logic ----------
 
 def main():
@@ -99,72 +143,53 @@ def main():
 
     # 1. Get Sites
     print("[*] Fetching Sites...")
-    sites = requests.get(f"{BASE_API_URL}/sdwan/v4.11/api/sites", headers=headers).json().get('items', [])
+    sites = inventory_cache.get_sites(SESSION, headers)
     target_tags = [t.strip() for t in args.tags.split(',')] if args.tags else []
-    
-    csv_data = []
-
-    for site in sites:
-        site_id = site['id']
-        site_name = site['name']
-        if target_tags and not any(tag in (site.get('tags') or []) for tag in target_tags):
-            continue
-
-        print(f"[*] Site: {site_name}")
-
-        # 2. Get Elements
-        elements = requests.get(f"{BASE_API_URL}/sdwan/v3.2/api/elements?site_id={site_id}", headers=headers).json().get('items', [])
-
-        for dev in elements:
-            element_id = dev['id']
-            print(f"  [+] Device: {dev['name']}")
-
-            # 3. Get Interfaces
-            intf_url = f"{BASE_API_URL}/sdwan/v4.21/api/sites/{site_id}/elements/{element_id}/interfaces"
-            intfs = requests.get(intf_url, headers=headers).json().get('items', [])
-
-            for i in intfs:
-                intf_id = i['id']
-                
-                # 4. Get Status (MAC/IP)
-                status_url = f"{BASE_API_URL}/sdwan/v3.9/api/sites/{site_id}/elements/{element_id}/interfaces/{intf_id}/status"
-                try:
-                    s_res = requests.get(status_url, headers=headers)
-                    if s_res.status_code == 200:
-                        stat = s_res.json()
-                        op_state = stat.get('operational_state', 'down')
-                        
-                        # 5. Get Utilization ONLY if interface is UP
-                        utilization = "0.00 Mbps"
-                        if op_state == "up":
-                            utilization = get_interface_bandwidth(headers, site_id, element_id, intf_id)
-
-                        ip_val = stat.get('ipv4_addresses')
-                        ip_str = ", ".join(ip_val) if isinstance(ip_val, list) else "N/A"
-
-                        csv_data.append({
-                            "Site": site_name,
-                            "Device": dev['name'],
-                            "Interface": i['name'],
-                            "State": op_state,
-                            "MAC Address": stat.get('mac_address', "N/A"),
-                            "IPv4 Address": ip_str,
-                            "Utilization (Avg 24h)": utilization,
-                            "Used For": i.get('used_for'),
-                            "VRF": stat.get('vrf', {}).get('vrf_context_name', "Global")
-                        })
-                        print(f"      - {i['name']}: {op_state} ({utilization})")
-                except Exception as e:
-                    print(f"    [!] Error on {i['name']}: {e}")
-
-    # 6. Write CSV
-    if csv_data:
-        filename = 'interface_bandwidth_audit.csv'
-        with open(filename, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=csv_data[0].keys())
-            writer.writeheader()
-            writer.writerows(csv_data)
+
+    # 2. Get Elements once and group them by site (one call instead of one per site)
+    print("[*] Fetching Elements...")
+    elements = inventory_cache.get_elements(SESSION, headers)
+    elems_by_site = defaultdict(list)
+    for e in elements:
+        elems_by_site[str(e.get('site_id'))].append(e)
+
+    # 6. Write CSV: rows are streamed to the file as each device completes
+    filename = 'interface_bandwidth_audit.csv'
+    row_count = 0
+    with open(filename, 'w', newline='') as f, ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_FIELDS)
+        for site in sites:
+            site_id = site['id']
+            site_name = site['name']
+            if target_tags and not any(tag in (site.get('tags') or []) for tag in target_tags):
+                continue
+
+            print(f"[*] Site: {site_name}")
+
+            for dev in elems_by_site.get(str(site_id), []):
+                element_id = dev['id']
+                print(f"  [+] Device: {dev['name']}")
+
+                # 3. Get Interfaces
+                intf_url = f"{BASE_API_URL}/sdwan/v4.21/api/sites/{site_id}/elements/{element_id}/interfaces"
+                intfs = SESSION.get(intf_url, headers=headers, timeout=REQUEST_TIMEOUT).json().get('items', [])
+                intfs = [i for i in intfs if is_auditable(i)]
+
+                # 4./5. Status and utilization per interface, fetched concurrently
+                rows = executor.map(lambda i: audit_interface(headers, site_name, site_id, dev, i), intfs)
+                for row in rows:
+                    if row is None:
+                        continue
+                    writer.writerow(row)
+                    row_count += 1
+                    if row_count % CSV_FLUSH_EVERY == 0:
+                        f.flush()
+
+    if row_count:
         print(f"\n[SUCCESS] Report generated: {filename}")
+    else:
+        os.remove(filename)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,78 +1,67 @@
 import os
-import requests
-import json
 import csv
 import argparse
 import time
 import sys
-import keyring
+import functools
+import prisma_auth
+import inventory_cache
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List
+from api_common import make_session, json_loads, json_dumps
 
 # ---------- Constants ----------
 AUTH_URL = "https://auth.apps.paloaltonetworks.com/oauth2/access_token"
 BASE_API_URL = "https://api.sase.paloaltonetworks.com"
 SERVICE_NAME = "prismasase" 
+MAX_WORKERS = 20  # concurrent site status queries
+CSV_FLUSH_EVERY = 100  # rows
+_MICRO_THRESHOLD = 10**11  # timestamps with 12+ digits are in microseconds, not seconds
 
-# ---------- Helpers ----------
+REPORT_FIELDS = ("Site Name", "Device Name", "Site Tags", "Serial Number", "Software Version", "Model",
+                 "Device Mode", "Uptime Duration", "Last Reboot Date", "Reboot Reason", "Last Disconnect",
+                 "Config Status", "Config IP", "Config Connect Time", "Analytics Status", "Flows Status",
+                 "Logs Status", "App Sig Version", "App Sig Date", "PoE State", "STP Enabled")
 
-def _get_credential(key: str) -> str:
-    val = keyring.get_password(SERVICE_NAME, key)
-    if not val:
-        print(f"CRITICAL ERROR: Credential '{key}' not found in Keychain for service '{SERVICE_NAME}'")
-        sys.exit(1)
-    return val
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) seconds
 
-def debug_request(response, label):
-    """Prints debug info if request fails."""
-    if not (200 <= response.status_code < 300):
-        print(f"DEBUG [{label}]: Request FAILED (Status {response.status_code})")
-        print(f"DEBUG [{label}]: Raw Response: {response.text[:500]}...") 
-        return False
-    return True
+# Shared keep-alive session with retries on transient errors
+SESSION = make_session(pool_connections=32, pool_maxsize=64, retry_posts=True)  # POSTs here are read-only queries
+
+# ---------- Helpers ----------
 
 def get_token() -> str:
-    client_id = _get_credential("client_id")
-    client_secret = _get_credential("client_secret")
-    tsg_id = _get_credential("tsg_id")
-
-    data = {
-        "client_id": client_id,
-        "client_secret": client_secret,
-        "scope": f"tsg_id:{tsg_id}",
-        "grant_type": "client_credentials",
-    }
-    
-    try:
-        r = requests.post(AUTH_URL, data=data, timeout=30)
-        if not debug_request(r, "Auth Token"): sys.exit(1)
-        return r.json()["access_token"]
-    except Exception as e:
-        print(f"CRITICAL ERROR getting token: {e}")
-        sys.exit(1)
+    # Reuses the Keychain-cached token across runs until it is about to expire
+    return prisma_auth.get_token(SESSION)
 
-def get_profile(headers: Dict[str, str]):
-    """Initializes the session profile."""
+def get_profile(headers: Dict[str, str]) -> str:
+    """Initializes the session profile; returns the token, refreshed if the cached one was rejected."""
     try:
-        requests.get(f"{BASE_API_URL}/sdwan/v2.1/api/profile", headers=headers).raise_for_status()
+        token = prisma_auth.init_profile(SESSION, headers, REQUEST_TIMEOUT)
         print("[*] Profile Initialized")
+        return token
     except Exception as e:
         print(f"CRITICAL: Failed to initialize profile: {e}")
         sys.exit(1)
 
+@functools.lru_cache(maxsize=4096)
+def _fmt_epoch(seconds: int) -> str:
+    # Many devices share reboot/update timestamps to the second; format each one once
+    return datetime.fromtimestamp(seconds).strftime('%Y-%m-%d %H:%M:%S')
+
 def fmt_time(ts):
     """Converts Prisma SD-WAN timestamps (seconds or microseconds) to string."""
     if not ts or ts == 0: return "N/A"
-    ts_str = str(ts)
-    if len(ts_str) > 11: ts = ts / 1_000_000.0
     try:
-        return datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
+        if ts >= _MICRO_THRESHOLD: ts = ts / 1_000_000.0
+        return _fmt_epoch(int(ts))
     except:
         return "Invalid TS"
 
 def calc_uptime(boot_time):
     if not boot_time or boot_time == 0: return "N/A"
-    if len(str(boot_time)) > 11: boot_time = boot_time / 1_000_000.0
+    if boot_time >= _MICRO_THRESHOLD: boot_time = boot_time / 1_000_000.0
     start = datetime.fromtimestamp(boot_time)
     delta = datetime.now() - start
     return str(delta).split('.')[0]
@@ -94,9 +83,9 @@ def fetch_site_status(token, site_id):
     }
     
     try:
-        resp = requests.post(url, headers=headers, json=payload)
+        resp = SESSION.post(url, headers=headers, data=json_dumps(payload), timeout=REQUEST_TIMEOUT)
         if resp.status_code == 200:
-            return resp.json().get('items', [])
+            return json_loads(resp.content).get('items', [])
         else:
             print(f"Warning: Failed to fetch status for site {site_id}: {resp.status_code}")
             return []
@@ -119,25 +108,22 @@ def main():
     }
     
     # 1. Initialize Profile
-    get_profile(headers)
+    token = get_profile(headers)
     
     # 2. Get Sites
     print("Fetching Sites...")
-    sites_res = requests.get(f"{BASE_API_URL}/sdwan/v4.11/api/sites", headers=headers)
-    if not debug_request(sites_res, "Get Sites"): sys.exit(1)
-    
-    sites_data = sites_res.json().get('items', [])
+    sites_data = inventory_cache.get_sites(SESSION, headers)
     site_map = {s['id']: s['name'] for s in sites_data}
     site_tags_map = {s['id']: (s.get('tags') or []) for s in sites_data}
+    site_tag_sets = {sid: frozenset(tags) for sid, tags in site_tags_map.items()}
 
     # 3. Get Elements Inventory
     print("Fetching Elements...")
-    elements_res = requests.get(f"{BASE_API_URL}/sdwan/v3.2/api/elements", headers=headers)
-    if not debug_request(elements_res, "Get Elements"): sys.exit(1)
-    elements = elements_res.json().get('items', [])
+    elements = inventory_cache.get_elements(SESSION, headers)
 
     # 4. Filter Elements & Build Unique Site List
-    target_tags = sorted([t.strip() for t in args.tags.split(',')]) if args.tags else []
+    # A device matches when its site carries ANY of the requested tags
+    target_tags = frozenset(t.strip() for t in args.tags.split(',')) if args.tags else frozenset()
     
     # We only want to fetch status for sites that actually have relevant devices
     relevant_site_ids = set()
@@ -147,8 +133,7 @@ def main():
         sid = dev.get('site_id')
         if not sid: continue
         
-        site_tags = site_tags_map.get(sid, [])
-        if args.tags and sorted(site_tags) != target_tags:
+        if target_tags and target_tags.isdisjoint(site_tag_sets.get(sid, ())):
             continue
             
         relevant_site_ids.add(sid)
@@ -160,9 +145,18 @@ def main():
     status_cache = {}
     print("Fetching Status for relevant sites...")
     
-    for i, sid in enumerate(relevant_site_ids):
-        print(f"  [{i+1}/{len(relevant_site_ids)}] Querying Site ID: {sid}...")
-        items = fetch_site_status(token, sid)
+    site_ids = list(relevant_site_ids)
+
+    def query_site(indexed_sid):
+        i, sid = indexed_sid
+        print(f"  [{i+1}/{len(site_ids)}] Querying Site ID: {sid}...")
+        return fetch_site_status(token, sid)
+
+    # Site queries are independent: run them concurrently, merge results here
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        site_statuses = list(executor.map(query_site, enumerate(site_ids)))
+
+    for items in site_statuses:
         for item in items:
             # Map element_id (or id) to the status item
             # The API returns "id" as the status record ID, but "element_id" inside the object
@@ -172,68 +166,70 @@ def main():
                 status_cache[item.get('element_id')] = item
 
     # 6. Generate CSV
-    csv_data = []
-    print("\nMapping data...")
+    if not filtered_elements:
+        print("\nNo devices found matching criteria.")
+        return
 
-    for dev in filtered_elements:
-        eid = dev.get('id')
-        sid = dev.get('site_id')
-        site_tags = site_tags_map.get(sid, [])
+    # Rows are streamed to the CSV as they are built
+    print("\nMapping data...")
+    filename = 'prisma_sdwan_full_audit.csv'
+    with open(filename, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_FIELDS)
+        for n, dev in enumerate(filtered_elements, 1):
+            eid = dev.get('id')
+            sid = dev.get('site_id')
+            site_tags = site_tags_map.get(sid, [])
         
-        # Try finding status by Element ID first
-        stat = status_cache.get(eid, {})
+            # Try finding status by Element ID first
+            stat = status_cache.get(eid, {})
         
-        tag_str = "; ".join(site_tags)
-
-        # Helpers
-        def conn_state(field):
-            val = stat.get(field)
-            return "Connected" if val is True else "Disconnected" if val is False else "N/A"
-
-        app_sig = stat.get('application_sig_file_info') or {}
-        switch = stat.get('switch_state', {})
-
-        row = {
-            "Site Name": site_map.get(sid, "Unassigned"),
-            "Device Name": dev.get('name'),
-            "Site Tags": tag_str,
-            "Serial Number": dev.get('serial_number'),
-            "Software Version": dev.get('software_version'),
-            "Model": dev.get('model_name'),
-            "Device Mode": stat.get('device_mode', "N/A"),
-            
-            "Uptime Duration": calc_uptime(stat.get('last_rebooted_time')),
-            "Last Reboot Date": fmt_time(stat.get('last_rebooted_time')),
-            "Reboot Reason": stat.get('last_rebooted_info', "N/A").strip(),
-            "Last Disconnect": fmt_time(stat.get('last_disconnected_time')),
-            
-            "Config Status": conn_state('config_and_events_connected'),
-            "Config IP": stat.get('config_and_events_from', "N/A"),
-            "Config Connect Time": fmt_time(stat.get('config_and_events_connected_on_utc')),
-
-            "Analytics Status": conn_state('analytics_live_connected'),
-            "Flows Status": conn_state('flows_live_connected'),
-            "Logs Status": conn_state('logs_live_connected'),
-            
-            "App Sig Version": app_sig.get('active_application_sig_file', "N/A"),
-            "App Sig Date": fmt_time(int(app_sig.get('application_sig_file_last_update', 0) or 0)),
-            
-            "PoE State": stat.get('poe_state', "N/A"),
-            "STP Enabled": switch.get('mstp_enabled', "N/A"),
-        }
+            tag_str = "; ".join(site_tags)
+
+            # Helpers
+            def conn_state(field):
+                val = stat.get(field)
+                return "Connected" if val is True else "Disconnected" if val is False else "N/A"
+
+            app_sig = stat.get('application_sig_file_info') or {}
+            switch = stat.get('switch_state', {})
+
+            # Tuple in REPORT_FIELDS order
+            row = (
+                site_map.get(sid, "Unassigned"),
+                dev.get('name'),
+                tag_str,
+                dev.get('serial_number'),
+                dev.get('software_version'),
+                dev.get('model_name'),
+                stat.get('device_mode', "N/A"),
+
+                calc_uptime(stat.get('last_rebooted_time')),
+                fmt_time(stat.get('last_rebooted_time')),
+                stat.get('last_rebooted_info', "N/A").strip(),
+                fmt_time(stat.get('last_disconnected_time')),
+
+                conn_state('config_and_events_connected'),
+                stat.get('config_and_events_from', "N/A"),
+                fmt_time(stat.get('config_and_events_connected_on_utc')),
+
+                conn_state('analytics_live_connected'),
+                conn_state('flows_live_connected'),
+                conn_state('logs_live_connected'),
+
+                app_sig.get('active_application_sig_file', "N/A"),
+                fmt_time(int(app_sig.get('application_sig_file_last_update', 0) or 0)),
+
+                stat.get('poe_state', "N/A"),
+                switch.get('mstp_enabled', "N/A"),
+            )
         
-        csv_data.append(row)
-        print(f"Processed: {dev.get('name')}")
-
-    if csv_data:
-        filename = 'prisma_sdwan_full_audit.csv'
-        with open(filename, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=csv_data[0].keys())
-            writer.writeheader()
-            writer.writerows(csv_data)
-        print(f"\nSUCCESS: Audit complete. Saved to: {filename}")
-    else:
-        print("\nNo devices found matching criteria.")
+            writer.writerow(row)
+            if n % CSV_FLUSH_EVERY == 0:
+                f.flush()
+            print(f"Processed: {dev.get('name')}")
+
+    print(f"\nSUCCESS: Audit complete. Saved to: {filename}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,52 +1,38 @@
 import os
 import json
 import argparse
-import requests
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Optional
 import json
 import argparse
-import requests
-import keyring  # <--- New Import
-from typing import Dict, Any, List, Optional
+import prisma_auth
+import inventory_cache
+from typing import Dict, Any, Optional
+from api_common import make_session, build_name_index
 
 # ---------- Constants ----------
 AUTH_URL = "https://auth.apps.paloaltonetworks.com/oauth2/access_token"
 BASE_API_URL = "https://api.sase.paloaltonetworks.com"
 SERVICE_NAME = "prismasase" # Consistency is key
 
-def _get_credential(key: str) -> str:
-    """Fetches credential from macOS Keychain."""
-    val = keyring.get_password(SERVICE_NAME, key)
-    if not val:
-        raise ValueError(f"Credential '{key}' not found in Keychain for service '{SERVICE_NAME}'")
-    return val
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) seconds
 
-def get_token() -> str:
-    # Fetching from Keychain instead of Environment Variables
-    client_id = _get_credential("client_id")
-    client_secret = _get_credential("client_secret")
-    tsg_id = _get_credential("tsg_id")
+# Shared keep-alive session with retries on transient errors
+SESSION = make_session(pool_connections=10, pool_maxsize=10, backoff_factor=1)
 
-    data = {
-        "client_id": client_id,
-        "client_secret": client_secret,
-        "scope": f"tsg_id:{tsg_id}",
-        "grant_type": "client_credentials",
-    }
-    
-    r = requests.post(AUTH_URL, data=data, timeout=30)
-    r.raise_for_status()
-    return r.json()["access_token"]
+def get_token() -> str:
+    # Reuses the Keychain-cached token across runs until it is about to expire
+    return prisma_auth.get_token(SESSION)
 
 def get_profile(headers: Dict[str, str]):
     # Mandatory session initialization
-    requests.get(f"{BASE_API_URL}/sdwan/v2.1/api/profile", headers=headers).raise_for_status()
+    prisma_auth.init_profile(SESSION, headers, REQUEST_TIMEOUT)
     print("[*] Profile Initialized")
 
 def main():
     parser = argparse.ArgumentParser(description="Prisma SD-WAN Remote Device Reboot")
     parser.add_argument("-S", "--site", required=True, help="Site Name")
     parser.add_argument("-D", "--device", required=True, help="Device (Element) Name to reboot")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore the local sites cache")
     args = parser.parse_args()
 
     token = get_token()
@@ -61,9 +47,11 @@ def main():
 
     # 1. Map Site Name to ID
     print(f"[*] Locating site: {args.site}...")
-    sites_res = requests.get(f"{BASE_API_URL}/sdwan/v4.11/api/sites", headers=headers)
-    sites_res.raise_for_status()
-    site_obj = next((s for s in sites_res.json().get('items', []) if s['name'] == args.site), None)
+    site_key = args.site.strip().lower()
+    site_obj = build_name_index(inventory_cache.get_sites(SESSION, headers, refresh=args.no_cache)).get(site_key)
+    if not site_obj and not args.no_cache:
+        # The site may be newer than the cached list
+        site_obj = build_name_index(inventory_cache.get_sites(SESSION, headers, refresh=True)).get(site_key)
     
     if not site_obj:
         print(f"[!] Error: Site '{args.site}' not found."); return
@@ -71,9 +59,8 @@ def main():
 
     # 2. Map Device Name to Element ID
     print(f"[*] Locating device '{args.device}' in site '{args.site}'...")
-    elems_res = requests.get(f"{BASE_API_URL}/sdwan/v3.1/api/elements?site_id={site_id}", headers=headers)
-    elems_res.raise_for_status()
-    target_elem = next((e for e in elems_res.json().get('items', []) if e['name'] == args.device), None)
+    device_key = args.device.strip().lower()
+    target_elem = build_name_index(inventory_cache.fetch_site_elements(SESSION, headers, site_id)).get(device_key)
     
     if not target_elem:
         print(f"[!] Error: Device '{args.device}' not found."); return
@@ -90,7 +77,7 @@ def main():
         "parameters": []
     }
 
-    resp = requests.post(ops_url, headers=headers, json=payload)
+    resp = SESSION.post(ops_url, headers=headers, json=payload, timeout=REQUEST_TIMEOUT)
     
     if resp.status_code in [200, 201, 204]:
         print(f"\n[SUCCESS] Reboot command sent to {args.device}.")
@@ -1,47 +1,92 @@
+import sys
 import json
+import time
+import random
 import argparse
 import requests
-import keyring  # <--- New Import
+import prisma_auth
+import inventory_cache
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
+from api_common import make_session, json_loads, json_dumps, build_name_index
 
 # ---------- Constants ----------
 AUTH_URL = "https://auth.apps.paloaltonetworks.com/oauth2/access_token"
 BASE_API_URL = "https://api.sase.paloaltonetworks.com"
 SERVICE_NAME = "prismasase" # Consistency is key
 
-def _get_credential(key: str) -> str:
-    """Fetches credential from macOS Keychain."""
-    val = keyring.get_password(SERVICE_NAME, key)
-    if not val:
-        raise ValueError(f"Credential '{key}' not found in Keychain for service '{SERVICE_NAME}'")
-    return val
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) seconds
+ALLOCATE_ATTEMPTS = 3
+# Machine states that mean an earlier allocate/claim request already went through
+CLAIM_STARTED_STATES = frozenset({"claimed", "claim_pending", "manufactured_cic_issued",
+                                  "manufactured_cic_issue_pending", "manufactured_cic_operational"})
+
+# Shared keep-alive session with retries on transient errors
+SESSION = make_session(pool_connections=10, pool_maxsize=10, backoff_factor=1)
 
 def get_token() -> str:
-    # Fetching from Keychain instead of Environment Variables
-    client_id = _get_credential("client_id")
-    client_secret = _get_credential("client_secret")
-    tsg_id = _get_credential("tsg_id")
-
-    data = {
-        "client_id": client_id,
-        "client_secret": client_secret,
-        "scope": f"tsg_id:{tsg_id}",
-        "grant_type": "client_credentials",
-    }
-    
-    r = requests.post(AUTH_URL, data=data, timeout=30)
-    r.raise_for_status()
-    return r.json()["access_token"]
+    # Reuses the Keychain-cached token across runs until it is about to expire
+    return prisma_auth.get_token(SESSION)
 
 def get_profile(headers: Dict[str, str]):
-    requests.get(f"{BASE_API_URL}/sdwan/v2.1/api/profile", headers=headers).raise_for_status()
+    prisma_auth.init_profile(SESSION, headers, REQUEST_TIMEOUT)
     print("[*] Profile Initialized")
 
+def get_items(headers: Dict[str, str], url: str) -> List[Dict]:
+    return json_loads(SESSION.get(url, headers=headers, timeout=REQUEST_TIMEOUT).content).get('items', [])
+
+def claim_target(machine: Dict[str, Any]):
+    """Returns (state, element id) of a machine; the element is set once an allocate/claim went through."""
+    return (machine.get('machine_state') or "").lower(), machine.get('em_element_id') or machine.get('element_id')
+
+def fetch_claim_target(headers: Dict[str, str], machine_id: str):
+    try:
+        res = SESSION.get(f"{BASE_API_URL}/sdwan/v2.5/api/machines/{machine_id}", headers=headers, timeout=REQUEST_TIMEOUT)
+        if res.status_code == 200:
+            return claim_target(json_loads(res.content))
+    except requests.RequestException:
+        pass
+    return "", None
+
+def allocate_to_shell(headers: Dict[str, str], machine_id: str, element_shell_id: str) -> bool:
+    """Allocates the machine, retrying transient failures only after checking the previous POST did not land."""
+    allocate_url = f"{BASE_API_URL}/sdwan/v2.0/api/machines/{machine_id}/allocate_to_shell"
+    # As per your curl example: simplified payload
+    body = json_dumps({"element_shell_id": element_shell_id})
+
+    for attempt in range(ALLOCATE_ATTEMPTS):
+        if attempt:
+            time.sleep((2 ** attempt) * (1 + random.random() * 0.5))
+            state, element_id = fetch_claim_target(headers, machine_id)
+            if state in CLAIM_STARTED_STATES:
+                if element_id == element_shell_id:
+                    print(f"\n[SUCCESS] Allocation Complete! (machine already '{state}')")
+                    return True
+                print(f"\n[FAILED] Machine is '{state}' for another element ({element_id}), not {element_shell_id}")
+                return False
+            print(f"[*] Retrying allocation (attempt {attempt + 1}/{ALLOCATE_ATTEMPTS})...")
+
+        try:
+            res = SESSION.post(allocate_url, headers=headers, data=body, timeout=REQUEST_TIMEOUT)
+        except requests.RequestException as e:
+            print(f"[!] Allocate request failed: {e}")
+            continue
+
+        if res.status_code in [200, 201]:
+            print(f"\n[SUCCESS] Allocation Complete!")
+            print(json.dumps(json_loads(res.content), indent=2))
+            return True
+        print(f"\n[FAILED] Error {res.status_code}: {res.text}")
+        if res.status_code < 500 and res.status_code != 429:
+            return False
+    return False
+
 def main():
     parser = argparse.ArgumentParser(description="Allocate Unclaimed ION to Shell")
     parser.add_argument("-S", "--site", required=True, help="Site Name")
     parser.add_argument("-D", "--device", required=True, help="Device (Element Shell) Name")
     parser.add_argument("-N", "--new_sn", required=True, help="Serial Number to Allocate")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore the local sites cache")
     args = parser.parse_args()
 
     token = get_token()
@@ -54,18 +99,27 @@ def main():
     
     get_profile(headers)
 
+    # The machine list does not depend on the site/shell lookups: fetch it in the background
+    executor = ThreadPoolExecutor(max_workers=1)
+    # Using v2.5 as per your example
+    machines_f = executor.submit(get_items, headers, f"{BASE_API_URL}/sdwan/v2.5/api/machines")
+    executor.shutdown(wait=False)
+
     # 1. Resolve Site ID
     print(f"[*] Locating site: {args.site}...")
-    sites_res = requests.get(f"{BASE_API_URL}/sdwan/v4.11/api/sites", headers=headers)
-    site_obj = next((s for s in sites_res.json().get('items', []) if s['name'] == args.site), None)
+    site_key = args.site.strip().lower()
+    site_obj = build_name_index(inventory_cache.get_sites(SESSION, headers, refresh=args.no_cache)).get(site_key)
+    if not site_obj and not args.no_cache:
+        # The site may be newer than the cached list
+        site_obj = build_name_index(inventory_cache.get_sites(SESSION, headers, refresh=True)).get(site_key)
     if not site_obj:
         print(f"[!] Error: Site '{args.site}' not found."); return
     site_id = site_obj['id']
 
-    # 2. Resolve Element Shell (Claimed Device entry)
+    # 2. Resolve Element Shell (Claimed Device entry); the API filters elements by site
     print(f"[*] Searching for Shell '{args.device}' in site '{args.site}'...")
-    elems_res = requests.get(f"{BASE_API_URL}/sdwan/v3.2/api/elements?site_id={site_id}", headers=headers)
-    target_elem = next((e for e in elems_res.json().get('items', []) if e['name'] == args.device), None)
+    device_key = args.device.strip().lower()
+    target_elem = build_name_index(inventory_cache.fetch_site_elements(SESSION, headers, site_id)).get(device_key)
     
     if not target_elem:
         print(f"[!] Error: Shell/Device '{args.device}' not found in site."); return
@@ -74,10 +128,7 @@ def main():
 
     # 3. Find Machine and Verify "Online" Status
     print(f"[*] Verifying status for Serial {args.new_sn}...")
-    # Using v2.5 as per your example
-    mac_res = requests.get(f"{BASE_API_URL}/sdwan/v2.5/api/machines", headers=headers)
-    all_machines = mac_res.json().get("items", [])
-    
+    all_machines = machines_f.result()
     machine = next((m for m in all_machines if m.get('sl_no') == args.new_sn), None)
     
     if not machine:
@@ -89,21 +140,18 @@ def main():
     if machine.get('machine_state') == 'retired':
         print(f"[!] Error: Device {args.new_sn} is in 'retired' state and cannot be claimed.")
         return
+    state, element_id = claim_target(machine)
+    if state in CLAIM_STARTED_STATES:
+        if element_id != element_shell_id:
+            print(f"[!] Error: Device {args.new_sn} is already '{state}' for another element ({element_id}).")
+            sys.exit(1)
+        print(f"[*] Device {args.new_sn} is already '{state}' for this shell; nothing to allocate.")
+        return
 
     # 4. Allocate to Shell
     print(f"[*] Allocating {args.new_sn} to Shell {args.device} ({element_shell_id})...")
-    allocate_url = f"{BASE_API_URL}/sdwan/v2.0/api/machines/{machine['id']}/allocate_to_shell"
-    
-    # As per your curl example: simplified payload
-    payload = {"element_shell_id": element_shell_id}
-
-    final_res = requests.post(allocate_url, headers=headers, json=payload)
-    
-    if final_res.status_code in [200, 201]:
-        print(f"\n[SUCCESS] Allocation Complete!")
-        print(json.dumps(final_res.json(), indent=2))
-    else:
-        print(f"\n[FAILED] Error {final_res.status_code}: {final_res.text}")
+    if not allocate_to_shell(headers, machine['id'], element_shell_id):
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,47 +1,71 @@
-import requests
-import json
 import csv
 import argparse
 from datetime import datetime, timezone, timedelta
-import keyring
+import prisma_auth
+import inventory_cache
+from concurrent.futures import ThreadPoolExecutor
 import sys
 from typing import Dict, List, Any
+from api_common import make_session, json_loads, json_dumps
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 # ---------- Constants ----------
 SERVICE_NAME = "prismasase"
 AUTH_URL = "https://auth.apps.paloaltonetworks.com/oauth2/access_token"
 BASE_URL = "https://api.sase.paloaltonetworks.com"
 
-def get_token():
-    try:
-        client_id = keyring.get_password(SERVICE_NAME, "client_id")
-        client_secret = keyring.get_password(SERVICE_NAME, "client_secret")
-        tsg_id = keyring.get_password(SERVICE_NAME, "tsg_id")
-        data = {"client_id": client_id, "client_secret": client_secret, "scope": f"tsg_id:{tsg_id}", "grant_type": "client_credentials"}
-        r = requests.post(AUTH_URL, data=data)
-        r.raise_for_status()
-        return r.json()["access_token"]
-    except Exception as e:
-        print(f"Auth Error: {e}")
-        sys.exit(1)
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) seconds
+LQM_TIMEOUT = (5, 60)  # the LQM metrics query can take longer to answer
+
+REPORT_FIELDS = ("Name", "Remote Site", "Connectivity", "Packet Loss (%)", "Jitter (ms)", "Latency (ms)", "Link MOS")
+
+# Shared keep-alive session with retries on transient errors
+SESSION = make_session(pool_connections=10, pool_maxsize=10, backoff_factor=1, retry_posts=True)  # topology/lqm POSTs are read-only queries
+
+# LQM metric name -> (CSV column, value extractor), resolved once per metric instead of per path
+LQM_HANDLERS = {
+    "LqmLatencyPointMetric": ("Latency (ms)", lambda d: round(d.get('rtt_latency', 0), 1)),
+    # Use the average of available directions to ensure we don't get 0
+    "LqmJitterPointMetric": ("Jitter (ms)", lambda d: round((d.get('downlink_jitter_avg', 0) + d.get('uplink_jitter_avg', 0)) / 2, 2)),
+    "LqmPktLossPointMetric": ("Packet Loss (%)", lambda d: f"{round((d.get('downlink_pkt_loss_avg', 0) + d.get('uplink_pkt_loss_avg', 0)) / 2, 2)}%"),
+    "LqmMosPointMetric": ("Link MOS", lambda d: round(d.get('downlink_mos_avg', 0), 1)),
+}
+
+def iter_metrics(res):
+    """Yields LQM metrics one at a time; streams the body with ijson when it is installed."""
+    if ijson is None:
+        yield from json_loads(res.content).get('metrics', [])
+        return
+    res.raw.decode_content = True  # let urllib3 undo gzip before parsing
+    yield from ijson.items(res.raw, "metrics.item", use_float=True)
+
+def get_token() -> str:
+    # Reuses the Keychain-cached token across runs until it is about to expire
+    return prisma_auth.get_token(SESSION)
 
 def get_profile(headers: Dict[str, str]):
-    requests.get(f"{BASE_URL}/sdwan/v2.1/api/profile", headers=headers).raise_for_status()
+    prisma_auth.init_profile(SESSION, headers, REQUEST_TIMEOUT)
     print("[*] Profile Initialized")
 
-def get_site_id_by_name(headers, name):
-    url = f"{BASE_URL}/sdwan/v4.11/api/sites"
-    r = requests.get(url, headers=headers)
-    r.raise_for_status()
-    for site in r.json().get('items', []):
+def get_site_id_by_name(headers, name, refresh=False):
+    sites = inventory_cache.get_sites(SESSION, headers, refresh=refresh)
+    for site in sites:
         if site.get('name') == name:
             return site.get('id')
+    if not refresh:
+        # The site may be newer than the cached list
+        return get_site_id_by_name(headers, name, refresh=True)
     print(f"ERROR: Could not find site named '{name}'")
     sys.exit(1)
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("-S", "--site", help="Site Name", required=True)
+    parser.add_argument("--no-cache", action="store_true", help="Ignore the local sites/elements cache")
     args = parser.parse_args()
 
     token = get_token()
@@ -49,16 +73,34 @@ def main():
     get_profile(headers)
 
     print(f"[*] Looking up ID for site: {args.site}...")
-    site_id = str(get_site_id_by_name(headers, args.site))
+    site_id = str(get_site_id_by_name(headers, args.site, refresh=args.no_cache))
 
-    # 1. Map Topology
-    print("[*] Mapping Topology...")
+    # 1./2. Topology and LQM metrics are independent: the LQM query covers every path at the
+    # site and is filtered against the topology's path_map locally
+    print("[*] Mapping Topology and Fetching Metrics...")
     topo_url = f"{BASE_URL}/sdwan/v3.6/api/topology"
-    topo_res = requests.post(topo_url, headers=headers, json={"type": "basenet", "nodes": [site_id]})
+    now = datetime.now(timezone.utc)
+    start_time = (now - timedelta(minutes=10)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    lqm_payload = {
+        "start_time": start_time,
+        "interval": "5min",
+        "filter": {"site": [site_id]},
+        "metrics": [
+            {"name": "LqmLatencyPointMetric", "unit": "milliseconds"},
+            {"name": "LqmMosPointMetric", "unit": "count"},
+            {"name": "LqmPktLossPointMetric", "unit": "percentage"},
+            {"name": "LqmJitterPointMetric", "unit": "milliseconds"}
+        ]
+    }
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        topo_f = executor.submit(SESSION.post, topo_url, headers=headers, data=json_dumps({"type": "basenet", "nodes": [site_id]}), timeout=REQUEST_TIMEOUT)
+        lqm_f = executor.submit(SESSION.post, f"{BASE_URL}/sdwan/monitor/v2.0/api/monitor/lqm_point_metrics", headers=headers, data=json_dumps(lqm_payload), stream=True, timeout=LQM_TIMEOUT)
+    topo_res, lqm_res = topo_f.result(), lqm_f.result()
     topo_res.raise_for_status()
+    lqm_res.raise_for_status()
     
     path_map = {}
-    for link in topo_res.json().get('links', []):
+    for link in json_loads(topo_res.content).get('links', []):
         # --- FILTER: Only VPN/Fabric types, ignore underlay stubs ---
         if link.get('type') not in ['vpn', 'servicelink', 'public-anynet', 'private-anynet']:
             continue
@@ -76,38 +118,23 @@ def main():
                 "status": link.get('status', 'unknown')
             }
 
-    # 2. Fetch LQM Metrics
-    print("[*] Fetching Metrics...")
-    now = datetime.now(timezone.utc)
-    start_time = (now - timedelta(minutes=10)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
-    lqm_payload = {
-        "start_time": start_time,
-        "interval": "5min",
-        "filter": {"site": [site_id], "path": list(path_map.keys())},
-        "metrics": [
-            {"name": "LqmLatencyPointMetric", "unit": "milliseconds"},
-            {"name": "LqmMosPointMetric", "unit": "count"},
-            {"name": "LqmPktLossPointMetric", "unit": "percentage"},
-            {"name": "LqmJitterPointMetric", "unit": "milliseconds"}
-        ]
-    }
-    lqm_res = requests.post(f"{BASE_URL}/sdwan/monitor/v2.0/api/monitor/lqm_point_metrics", headers=headers, json=lqm_payload)
-    lqm_res.raise_for_status()
-
     # 3. Process Data
+    # Only paths that are up are reported; resolve that once instead of per metric
+    up_pids = frozenset(pid for pid, meta in path_map.items() if meta['status'].lower() == "up")
     results = {}
-    for metric in lqm_res.json().get('metrics', []):
-        m_name = metric['name']
+    for metric in iter_metrics(lqm_res):
+        handler = LQM_HANDLERS.get(metric['name'])
+        if handler is None: continue
+        column, extract = handler
         for site_data in metric.get('sites', []):
             for p in site_data.get('paths', []):
                 pid = p['path_id']
-                if pid not in path_map: continue
-                
-                meta = path_map[pid]
-                if meta['status'].lower() != "up": continue
+                if pid not in up_pids: continue
 
-                if pid not in results:
-                    results[pid] = {
+                row = results.get(pid)
+                if row is None:
+                    meta = path_map[pid]
+                    row = results[pid] = {
                         "Name": meta['display_name'],
                         "Remote Site": meta['remote_context'],
                         "Connectivity": meta['status'],
@@ -117,27 +144,16 @@ def main():
                         "Link MOS": "4.4"
                     }
                 
-                data = p['data']
-                if m_name == "LqmLatencyPointMetric":
-                    results[pid]["Latency (ms)"] = round(data.get('rtt_latency', 0), 1)
-                elif m_name == "LqmJitterPointMetric":
-                    # Use the average of available directions to ensure we don't get 0
-                    results[pid]["Jitter (ms)"] = round((data.get('downlink_jitter_avg', 0) + data.get('uplink_jitter_avg', 0)) / 2, 2)
-                elif m_name == "LqmPktLossPointMetric":
-                    results[pid]["Packet Loss (%)"] = f"{round((data.get('downlink_pkt_loss_avg', 0) + data.get('uplink_pkt_loss_avg', 0)) / 2, 2)}%"
-                elif m_name == "LqmMosPointMetric":
-                    results[pid]["Link MOS"] = round(data.get('downlink_mos_avg', 0), 1)
+                row[column] = extract(p['data'])
 
     # 4. Export
     if results:
         filename = f"path_health_{args.site.replace(' ', '_')}.csv"
         with open(filename, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=list(results[next(iter(results))].keys()))
-            writer.writeheader()
-            for row in results.values():
-                # Final check: only output if we have real data (Latency > 0)
-                if row["Latency (ms)"] != 0:
-                    writer.writerow(row)
+            writer = csv.writer(f)
+            writer.writerow(REPORT_FIELDS)
+            # Final check: only output if we have real data (Latency > 0)
+            writer.writerows([row[c] for c in REPORT_FIELDS] for row in results.values() if row["Latency (ms)"] != 0)
         print(f"\n[SUCCESS] Report generated: {filename}")
     else:
         print(f"\n[!] No active 'up' paths found.")
@@ -1,4 +1,5 @@
-import os, subprocess, argparse
+import os, sys, subprocess, argparse
+from concurrent.futures import ThreadPoolExecutor
 
 # Map the -P flag to the filenames in your backup folder
 POLICY_FILES = {
@@ -9,15 +10,26 @@ POLICY_FILES = {
     "performance": "01_backups/02_policies/performance_policyconfig.yml"
 }
 
-def run_cmd(name, cmd, cwd):
+def run_cmd(name, cmd, cwd, buffered=False):
+    # buffered: collect the child's output and write it as one block when it exits, so
+    # concurrent restores do not interleave line by line on the terminal
     print(f"[*] Starting Restore: {name}")
     env = os.environ.copy()
     env["PYTHONPATH"] = f"{os.getcwd()}:{env.get('PYTHONPATH', '')}"
+    capture = {"stdout": subprocess.PIPE, "stderr": subprocess.STDOUT, "text": True} if buffered else {}
     try:
-        subprocess.run(cmd, cwd=cwd, check=True, shell=True, env=env)
-        print(f"[+] {name} Success.\n")
+        # argv list, no shell: one exec per restore and no quoting issues in file names
+        res = subprocess.run(cmd, cwd=cwd, check=True, env=env, **capture)
+        status = f"[+] {name} Success.\n"
+    except subprocess.CalledProcessError as e:
+        res = e
+        status = f"[!] {name} Failed: {e}\n"
     except Exception as e:
-        print(f"[!] {name} Failed: {e}\n")
+        res = None
+        status = f"[!] {name} Failed: {e}\n"
+    output = (res.stdout or "") if buffered and res is not None else ""
+    sys.stdout.write(f"{output}{status}\n")
+    sys.stdout.flush()
 
 def main():
     parser = argparse.ArgumentParser()
@@ -26,15 +38,17 @@ def main():
     parser.add_argument("-S", "--site")
     # --- ADDED THIS LINE ---
     parser.add_argument("-F", "--filename", help="Specific YAML file to use")
+    parser.add_argument("--serial", action="store_true", help="Restore policy types one after another (if the API rate-limits)")
     args = parser.parse_args()
 
     if args.resources:
         # Use provided filename or default
         fname = args.filename or "../01_backups/01_resources/latest_resources.yml"
-        run_cmd("Resources", f"python3 push_resources_refactored.py --filename '{fname}'", "02_policy_scripts")
+        run_cmd("Resources", [sys.executable, "push_resources_refactored.py", "--filename", fname], "02_policy_scripts")
 
     if args.policies:
         targets = ["nat", "path", "qos", "security", "performance"] if args.policies == "all" else [args.policies]
+        jobs = []
         for p in targets:
             if p in POLICY_FILES:
                 # If you provided a filename in the terminal, use it. 
@@ -47,12 +61,21 @@ def main():
                 else:
                     final_path = raw_path
 
-                cmd = f"python3 push_policy_refactored_original-gemini.py -PT {p} -F '{final_path}'"
-                run_cmd(f"Policy: {p}", cmd, "02_policy_scripts")
+                cmd = [sys.executable, "push_policy_refactored_original-gemini.py", "-PT", p, "-F", final_path]
+                jobs.append((f"Policy: {p}", cmd, "02_policy_scripts"))
+
+        # Each policy type is pushed by its own child process against its own endpoints,
+        # so they can run side by side
+        if args.serial or len(jobs) < 2:
+            for job in jobs:
+                run_cmd(*job)
+        else:
+            with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+                list(executor.map(lambda job: run_cmd(*job, buffered=True), jobs))
 
     if args.site:
         fname = args.filename or f"../01_backups/03_sites/{args.site}.yml"
-        run_cmd(f"Site: {args.site}", f"python3 do_site.py --force-update '{fname}'", "03_config_tool")
+        run_cmd(f"Site: {args.site}", [sys.executable, "do_site.py", "--force-update", fname], "03_config_tool")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file